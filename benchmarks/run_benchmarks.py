@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCHMARK_DIR, '..')
+# The pipelines import their own modules by name, as they do when run from their folder
+sys.path.extend([REPO_DIR, os.path.join(REPO_DIR, 'zomato_order_analysis'), os.path.join(REPO_DIR, 'swiggy_order_analysis')])
+
+import swiggy_analysis
+import zomato_order_store
+import zomato_predective_analysis
+from order_common.item_aggregation import aggregate_items, explode_order_items, split_aggregate
+from order_common.item_canonical import canonical_item_names
+from order_common.order_store import normalize_items, normalize_orders, save_order_store, sort_orders_by_time
+from order_common.report_writer import write_report
+from synthetic_orders import generate_swiggy_export, generate_zomato_invoices
+
+try:
+    import resource
+except ImportError:
+    # Windows has no getrusage, peak RSS is left out there
+    resource = None
+
+PLATFORMS = ['zomato', 'swiggy-csv', 'swiggy-xlsx']
+
+# Stage timings below this many seconds are too noisy to call a regression
+NOISE_FLOOR_SECONDS = 0.05
+
+
+def peak_rss_mib():
+    # High-water mark of this process and of the largest finished worker process, in MiB (Linux reports KiB)
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+def run_stage(results, platform, order_count, stage, func, trace_alloc=False):
+    if trace_alloc:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        output = func()
+    finally:
+        seconds = time.perf_counter() - start_time
+        peak_allocation = tracemalloc.get_traced_memory()[1] if trace_alloc else None
+        if trace_alloc:
+            tracemalloc.stop()
+
+    results.append({
+        'platform': platform,
+        'orders': order_count,
+        'stage': stage,
+        'seconds': round(seconds, 4),
+        'orders_per_sec': round(order_count / seconds, 1) if seconds else None,
+        'peak_rss_mib': peak_rss_mib(),
+        'peak_alloc_mib': round(peak_allocation / 1024 / 1024, 1) if peak_allocation is not None else None,
+    })
+    return output
+
+def normalize_tables(orders_df, items_df, menu_dir):
+    orders, items = sort_orders_by_time(normalize_orders(orders_df.reset_index(drop=True)), normalize_items(items_df))
+    # A fresh memo per run, so every size pays for resolving its item names once
+    items = canonical_item_names(items, os.path.join(menu_dir, 'item_canonical.parquet'), os.path.join(menu_dir, 'item_overrides.csv'))
+    return orders, items
+
+def aggregate_sheets(orders, items):
+    # Same reports as the pipelines: one sheet per weekday and meal slot
+    item_totals = aggregate_items(explode_order_items(orders, items, ['day', 'meal_type']), ['day', 'meal_type'])
+    return {'_'.join(map(str, key)): frame for key, frame in split_aggregate(item_totals, ['day', 'meal_type'])}
+
+def write_outputs(out_dir, orders, items, sheets):
+    save_order_store(os.path.join(out_dir, 'order_store'), orders, items)
+    write_report(sheets, os.path.join(out_dir, 'item_counts.xlsx'), skip_unchanged=False)
+
+def benchmark_zomato(results, work_dir, order_count, args):
+    # Every size shares one invoice folder and reads its first order_count invoices, sizes run smallest
+    # first so each one only generates the invoices the previous sizes didn't
+    file_list = generate_zomato_invoices(os.path.join(work_dir, 'zomato_orders'), order_count, args.seed, args.workers)
+    out_dir = os.path.join(work_dir, 'runs', f'zomato_{order_count}')
+    platform = 'zomato'
+
+    def extract():
+        order_dicts, _ = zomato_predective_analysis.extract_orders(file_list, args.workers)
+        return order_dicts
+
+    def normalize():
+        order_df = zomato_predective_analysis.build_order_frame(list(order_dicts.values()))
+        return normalize_tables(*zomato_order_store.build_order_tables(order_df), os.path.join(out_dir, 'menu'))
+
+    order_dicts = run_stage(results, platform, order_count, 'extract', extract, args.trace_alloc)
+    orders, items = run_stage(results, platform, order_count, 'normalize', normalize, args.trace_alloc)
+    sheets = run_stage(results, platform, order_count, 'aggregate', lambda: aggregate_sheets(orders, items), args.trace_alloc)
+    run_stage(results, platform, order_count, 'write', lambda: write_outputs(out_dir, orders, items, sheets), args.trace_alloc)
+
+def benchmark_swiggy(results, work_dir, order_count, export_format, args):
+    path = os.path.join(work_dir, f'swiggy_orders_{order_count}.{export_format}')
+    if not os.path.exists(path):
+        generate_swiggy_export(path, order_count, args.seed)
+    out_dir = os.path.join(work_dir, 'runs', f'swiggy_{export_format}_{order_count}')
+    platform = f'swiggy-{export_format}'
+
+    def extract():
+        # Same reader as swiggy_analysis.main()
+        return swiggy_analysis.read_export(path)
+
+    def normalize():
+        df = swiggy_analysis.normalize_export(export_df)
+        return normalize_tables(*swiggy_analysis.build_order_tables(df), os.path.join(out_dir, 'menu'))
+
+    export_df = run_stage(results, platform, order_count, 'extract', extract, args.trace_alloc)
+    orders, items = run_stage(results, platform, order_count, 'normalize', normalize, args.trace_alloc)
+    sheets = run_stage(results, platform, order_count, 'aggregate', lambda: aggregate_sheets(orders, items), args.trace_alloc)
+    run_stage(results, platform, order_count, 'write', lambda: write_outputs(out_dir, orders, items, sheets), args.trace_alloc)
+
+def with_totals(results_df):
+    # One extra 'total' row per platform and size
+    totals = results_df.groupby(['platform', 'orders'], sort=False).agg(seconds=('seconds', 'sum'), peak_rss_mib=('peak_rss_mib', 'max')).reset_index()
+    totals['stage'] = 'total'
+    totals['orders_per_sec'] = (totals['orders'] / totals['seconds']).round(1)
+    return pd.concat([results_df, totals], ignore_index=True).sort_values(['platform', 'orders'], kind='stable')
+
+def find_regressions(results, baseline_path, tolerance):
+    # Stages slower than the baseline run by more than the tolerance
+    with open(baseline_path) as f:
+        baseline = {(row['platform'], row['orders'], row['stage']): row['seconds'] for row in json.load(f)}
+    regressions = []
+    for row in results:
+        previous = baseline.get((row['platform'], row['orders'], row['stage']))
+        if previous is not None and row['seconds'] > previous * (1 + tolerance) and row['seconds'] - previous > NOISE_FLOOR_SECONDS:
+            regressions.append((row['platform'], row['orders'], row['stage'], previous, row['seconds']))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Time every pipeline stage on synthetic Zomato and Swiggy orders')
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')], default=[1000, 10000, 100000],
+                        help='Comma separated order counts; 100k Zomato invoices take a while to generate the first time')
+    parser.add_argument('--platform', choices=PLATFORMS, action='append',
+                        help='Only benchmark this platform, can be given more than once')
+    parser.add_argument('--work-dir', default='benchmark_data', help='Folder for the generated inputs and outputs')
+    parser.add_argument('--workers', type=int, default=0, help='Processes for PDF generation and extraction, 0 uses every core')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic orders')
+    parser.add_argument('--trace-alloc', action='store_true',
+                        help='Record the peak Python allocation of every stage (slows every stage down)')
+    parser.add_argument('--output', default=None, help='JSON file for the results, defaults to <work-dir>/benchmark_results.json')
+    parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline, 0.25 = 25%%')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    platforms = args.platform or PLATFORMS
+
+    results = []
+    for order_count in sorted(args.sizes):
+        for platform in platforms:
+            print(f'Benchmarking {platform} with {order_count} orders')
+            if platform == 'zomato':
+                benchmark_zomato(results, args.work_dir, order_count, args)
+            else:
+                benchmark_swiggy(results, args.work_dir, order_count, platform.split('-')[1], args)
+
+    output_path = args.output or os.path.join(args.work_dir, 'benchmark_results.json')
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(with_totals(pd.DataFrame(results)).to_string(index=False))
+    print(f'Results written to {output_path}')
+
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.tolerance)
+        for platform, order_count, stage, previous, seconds in regressions:
+            print(f'REGRESSION {platform} {order_count} orders {stage}: {previous:.3f}s -> {seconds:.3f}s')
+        if regressions:
+            sys.exit(1)
+        print(f'No stage slower than the baseline by more than {args.tolerance:.0%}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import csv
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import fitz  # PyMuPDF
+
+# Any TTF with a ₹ glyph works, the invoices print every amount with it
+INVOICE_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+# (item name, unit price) with the variant text both platforms really put in names
+MENU = [
+    ('Rice Kheer [100 ml]', 49),
+    ('Ghanta Tarkari', 99),
+    ('Odisha Special Economic Egg Curry Thali [Serves 1] Choice Of Egg Curry Egg (2 pcs) Alu Curry 300gm', 139),
+    ('Odisha Special Veg Curry Thali', 169),
+    ('Odisha Special Chicken Curry Thali', 229),
+    ('Kukuda (6 Pcs) Alu Kosa', 199),
+    ('Upma, Choice Of Curry & Chutney', 99),
+    ('Puri (4 Pcs), Choice Of Veg Curry & Chutney', 94),
+    ('Chhena Payas', 79),
+    ('Tawa Roti', 20),
+    ('Paneer Butter Masala', 189),
+    ('Veg Hakka Noodles', 129),
+]
+
+SWIGGY_PREAMBLE = [
+    ['Swiggy Order Report'],
+    ['Duration :', '2023-08-01', '2023-09-30'],
+    ['Restaurant Name & Address :', 'Synthetic Kitchen', 'Benchmark Street'],
+    ['Restaurant Id :', '000000'],
+    ['Disclaimer', 'Synthetic data generated for benchmarking.'],
+]
+SWIGGY_HEADER = [
+    'Order ID', 'Order-status', 'Order-relay-time(ordered time)', 'Order-acceptance-time <placed_time>',
+    'Order-delivery-time', 'Total-bill-amount <bill>', 'Tax Restaurant', 'Item-SGST', 'Item-CGST', 'Item-IGST',
+    'PackagingCharge-SGST', 'PackagingCharge-CGST', 'PackagingCharge-IGST', 'ServiceCharge-SGST', 'ServiceCharge-CGST',
+    'ServiceCharge-IGST', 'Item-GST-Inclusive', 'Packaging_GST_Inclusive', 'ServiceCharge-GST-inclusive',
+    'Restaurant Trade Discount', 'Restaurant Coupon Discount Share', 'Packing-charge', 'Cancelled reason',
+    'Food-prepared <Yes/No>', 'Order-Cancellation-time', 'Edited-status', 'Item-count', 'MOU type',
+    'Cancellation-responsible-entity', 'Restaurant-bear', 'Item1-name_reward_type_quantity_price+Variants+Addons',
+]
+# Up to five items per order, the first in the named column and the rest in the unnamed 31..34
+MAX_ITEMS = 5
+
+FIRST_ORDER_TIME = datetime(2023, 8, 1, 7, 0)
+ZOMATO_FIRST_ORDER_ID = 5100000000
+SWIGGY_FIRST_ORDER_ID = 155000000000000
+
+
+def synthetic_order(order_number, seed=0):
+    # The same order number always gives the same order, so a larger run extends a smaller one
+    rng = random.Random(seed * 1000003 + order_number)
+    ordered_at = FIRST_ORDER_TIME + timedelta(minutes=37 * order_number + rng.randint(0, 30))
+    if not 7 <= ordered_at.hour < 23:
+        ordered_at = ordered_at.replace(hour=rng.randint(7, 22))
+    items = [(name, price, rng.randint(1, 3)) for name, price in rng.sample(MENU, rng.randint(1, MAX_ITEMS))]
+    return ordered_at, items
+
+def ordinal_day(day):
+    if 11 <= day <= 13:
+        return f'{day}th'
+    return f'{day}{ {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th") }'
+
+def invoice_lines(order_id, ordered_at, items):
+    # Same line order as a Zomato invoice: time above PAID, items between Summary and Taxes, Promo above Total
+    subtotal = sum(price * quantity for _, price, quantity in items)
+    ordered_date_time = f'{ordinal_day(ordered_at.day)} {ordered_at:%b %Y} at {ordered_at:%I:%M %p}'.replace(' at 0', ' at ')
+    lines = [f'Zomato order: {order_id}', 'Synthetic Kitchen', ordered_date_time, 'PAID', 'Order Summary']
+    for name, price, quantity in items:
+        lines += [name, f'{quantity} x {price} ₹{price * quantity}.00 ']
+    lines += ['Taxes', f'₹{subtotal * 0.05:.2f}', 'Promo', '-₹40.00', 'Total', f'₹{subtotal * 1.05 - 40:.2f}']
+    return lines
+
+def write_invoice_pdf(path, lines, font):
+    pdf_document = fitz.open()
+    page = pdf_document.new_page()
+    writer = fitz.TextWriter(page.rect)
+    for line_number, line in enumerate(lines):
+        writer.append((30, 40 + 12 * line_number), line, font=font, fontsize=8)
+    writer.write_text(page)
+    # Only the glyphs used are embedded, a full font would make every invoice ~800 KB
+    pdf_document.subset_fonts()
+    pdf_document.save(path, garbage=1, deflate=True)
+    pdf_document.close()
+
+def write_invoice_batch(out_dir, order_numbers, seed):
+    font = fitz.Font(fontfile=INVOICE_FONT)
+    for order_number in order_numbers:
+        path = os.path.join(out_dir, f'{ZOMATO_FIRST_ORDER_ID + order_number}.pdf')
+        if not os.path.exists(path):
+            ordered_at, items = synthetic_order(order_number, seed)
+            write_invoice_pdf(path, invoice_lines(ZOMATO_FIRST_ORDER_ID + order_number, ordered_at, items), font)
+    return len(order_numbers)
+
+def generate_zomato_invoices(out_dir, count, seed=0, workers=0):
+    # Invoices already on disk are kept, so growing the run only writes the new ones
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    batches = [range(start, min(start + 500, count)) for start in range(0, count, 500)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        list(executor.map(write_invoice_batch, [out_dir] * len(batches), batches, [seed] * len(batches)))
+    return [os.path.join(out_dir, f'{ZOMATO_FIRST_ORDER_ID + order_number}.pdf') for order_number in range(count)]
+
+def swiggy_row(order_number, seed=0):
+    ordered_at, items = synthetic_order(order_number, seed)
+    subtotal = sum(price * quantity for _, price, quantity in items)
+    row = [
+        SWIGGY_FIRST_ORDER_ID + order_number, 'delivered', f'{ordered_at:%Y-%m-%d %H:%M:%S}',
+        f'{ordered_at + timedelta(seconds=20):%Y-%m-%d %H:%M:%S}', f'{ordered_at + timedelta(minutes=40):%Y-%m-%d %H:%M:%S}',
+        f'{subtotal * 1.05:.2f}', f'{subtotal * 0.05:.2f}', f'{subtotal * 0.025:.2f}', f'{subtotal * 0.025:.2f}',
+        0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 'false', 'false', 'false', 0, 40.0, '0.00', '', '', '', 'unedited',
+        len(items), 'NEW_MOU', '', '',
+    ]
+    # 'name_reward_quantity_price+variants', the price is the line total
+    return row + [f'{name}_NA_{quantity}_{price * quantity}' for name, price, quantity in items]
+
+def generate_swiggy_export(path, count, seed=0):
+    # Same layout as the real export: five report lines, the header, then one order per row
+    out_dir = os.path.dirname(path)
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    rows = (swiggy_row(order_number, seed) for order_number in range(count))
+
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerows(SWIGGY_PREAMBLE)
+            writer.writerow(SWIGGY_HEADER)
+            writer.writerows(rows)
+        return path
+
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet()
+        for row_index, row in enumerate(SWIGGY_PREAMBLE + [SWIGGY_HEADER]):
+            worksheet.write_row(row_index, 0, row)
+        for row_index, row in enumerate(rows, start=len(SWIGGY_PREAMBLE) + 1):
+            worksheet.write_row(row_index, 0, row)
+    finally:
+        workbook.close()
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Zomato invoices and Swiggy exports')
+    parser.add_argument('--orders', type=int, default=1000, help='Number of orders to generate')
+    parser.add_argument('--out-dir', default='benchmark_data', help='Folder for the generated files')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the order contents')
+    parser.add_argument('--skip-pdf', action='store_true', help='Only write the Swiggy exports')
+    args = parser.parse_args()
+
+    if not args.skip_pdf:
+        generate_zomato_invoices(os.path.join(args.out_dir, 'zomato_orders'), args.orders, args.seed)
+    for extension in ['csv', 'xlsx']:
+        generate_swiggy_export(os.path.join(args.out_dir, f'swiggy_orders_{args.orders}.{extension}'), args.orders, args.seed)
+    print(f'Generated {args.orders} orders in {args.out_dir}')
+
+if __name__ == "__main__":
+    main()
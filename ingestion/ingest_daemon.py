@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+INGESTION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(INGESTION_DIR, '..')
+# The pipelines import their own modules by name, as they do when run from their folder
+sys.path.extend([REPO_DIR, os.path.join(REPO_DIR, 'zomato_order_analysis'), os.path.join(REPO_DIR, 'swiggy_order_analysis')])
+
+import swiggy_analysis
+import zomato_order_store
+import zomato_predective_analysis
+from order_common.calendar_exposure import check_closure_args, exposure_for, parse_closures
+from order_common.instrumentation import close_run_log, count, log_event, new_metrics, open_run_log, timed
+from order_common.item_aggregation import aggregate_items, explode_order_items
+from order_common.item_canonical import canonical_item_names
+from order_common.report_writer import REPORT_FORMATS, write_report
+from order_common.timestamps import MEAL_SLOTS, parse_meal_slots
+
+COUNTER_COLUMNS = ['platform', 'ordered_day', 'ordered_type', 'item_name']
+COUNTERS_FILE = 'counters.parquet'
+SEEN_FILES_FILE = 'seen_files.parquet'
+SEEN_ORDERS_FILE = 'seen_orders.parquet'
+SEEN_ORDER_COLUMNS = ['platform', 'order_id', 'ordered_date_time']
+
+SWIGGY_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def new_ingest_state():
+    return {
+        # (platform, weekday, meal slot, item) -> quantity, the numbers behind every item count sheet
+        'counters': {},
+        # path -> (size, mtime_ns) of every file already applied
+        'seen_files': {},
+        # (platform, order id, order time) of every applied order, so a re-exported order counts once
+        'seen_orders': set(),
+        # path -> (size, mtime_ns) from the previous poll, a file is only read once it stops changing
+        'pending_files': {},
+        'dirty': False,
+    }
+
+def write_parquet_atomic(df, path):
+    # A crash mid-write never leaves a half written checkpoint behind
+    temp_path = path + '.tmp'
+    df.to_parquet(temp_path, index=False)
+    os.replace(temp_path, path)
+
+def save_checkpoint(state, state_dir):
+    if not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+    counters = pd.DataFrame([key + (quantity,) for key, quantity in state['counters'].items()], columns=COUNTER_COLUMNS + ['quantity'])
+    seen_files = pd.DataFrame([(path,) + stamp for path, stamp in state['seen_files'].items()], columns=['path', 'size', 'mtime_ns'])
+    seen_orders = pd.DataFrame(list(state['seen_orders']), columns=SEEN_ORDER_COLUMNS).sort_values(SEEN_ORDER_COLUMNS, ignore_index=True)
+    write_parquet_atomic(counters, os.path.join(state_dir, COUNTERS_FILE))
+    write_parquet_atomic(seen_files, os.path.join(state_dir, SEEN_FILES_FILE))
+    write_parquet_atomic(seen_orders, os.path.join(state_dir, SEEN_ORDERS_FILE))
+    state['dirty'] = False
+
+def load_checkpoint(state_dir):
+    state = new_ingest_state()
+    counters_path = os.path.join(state_dir, COUNTERS_FILE)
+    if not os.path.exists(counters_path):
+        return state
+    counters = pd.read_parquet(counters_path)
+    state['counters'] = {
+        tuple(key): int(quantity)
+        for *key, quantity in counters[COUNTER_COLUMNS + ['quantity']].itertuples(index=False)
+    }
+    seen_files = pd.read_parquet(os.path.join(state_dir, SEEN_FILES_FILE))
+    state['seen_files'] = {path: (int(size), int(mtime_ns)) for path, size, mtime_ns in seen_files.itertuples(index=False)}
+    seen_orders = pd.read_parquet(os.path.join(state_dir, SEEN_ORDERS_FILE))
+    state['seen_orders'] = set(seen_orders.itertuples(index=False, name=None))
+    return state
+
+def list_input_files(zomato_dir, swiggy_dir):
+    files = []
+    if zomato_dir and os.path.isdir(zomato_dir):
+        files += [('zomato', path) for path in zomato_predective_analysis.list_pdf_files(zomato_dir) if path.lower().endswith('.pdf')]
+    if swiggy_dir and os.path.isdir(swiggy_dir):
+        files += [
+            ('swiggy', os.path.join(swiggy_dir, filename)) for filename in sorted(os.listdir(swiggy_dir))
+            if filename.lower().endswith(SWIGGY_EXTENSIONS) and not filename.startswith('~$')
+        ]
+    return files
+
+def settled_new_files(state, files):
+    # New or changed files whose size and mtime match the previous poll, i.e. done being copied in
+    ready = []
+    pending_files = {}
+    for platform, path in files:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if state['seen_files'].get(path) == stamp:
+            continue
+        if state['pending_files'].get(path) == stamp:
+            ready.append((platform, path, stamp))
+        else:
+            pending_files[path] = stamp
+    state['pending_files'] = pending_files
+    return ready
+
+def parse_swiggy_export(path, meal_slots=MEAL_SLOTS):
+    # Worker entry point for a Swiggy export, same reader as swiggy_analysis.main()
+    try:
+        df = swiggy_analysis.read_export(path)
+        orders, items = swiggy_analysis.build_order_tables(swiggy_analysis.normalize_export(df), meal_slots)
+        return path, (orders, items), None
+    except Exception as e:
+        return path, None, f'{type(e).__name__}: {e}'
+
+def parse_input_file(platform, path, meal_slots=MEAL_SLOTS):
+    if platform == 'zomato':
+        pdf_path, order_dict, error, _ = zomato_predective_analysis.extract_order_dict_safe(path)
+        return pdf_path, order_dict, error
+    return parse_swiggy_export(path, meal_slots)
+
+def zomato_order_tables(order_dicts, meal_slots):
+    order_df = zomato_predective_analysis.build_order_frame(order_dicts, meal_slots)
+    return zomato_order_store.build_order_tables(order_df)
+
+def unseen_orders(state, orders, items):
+    # Drop orders an earlier file already applied, e.g. a Swiggy export overlapping the previous one.
+    # Every key part is a string, orders without a readable time get 'NaT'. Only orders with an id are
+    # matched, an order without one is always kept and gets a key of its own so its time is still recorded
+    keys = list(zip(
+        orders['platform'].astype(str),
+        orders['order_id'].astype('string').fillna('NA'),
+        orders['ordered_date_time'].dt.strftime('%Y-%m-%d %H:%M:%S').fillna('NaT'),
+    ))
+    keep = []
+    for key, has_id in zip(keys, orders['order_id'].notna()):
+        if not has_id:
+            # The set only grows, so its size is never handed out twice
+            key = (key[0], f'NA-{len(state["seen_orders"])}', key[2])
+        keep.append(key not in state['seen_orders'])
+        state['seen_orders'].add(key)
+    kept_index = orders.index[keep]
+    position = pd.Series(range(len(kept_index)), index=kept_index)
+    orders = orders.loc[kept_index].reset_index(drop=True)
+    items = items[items['order_index'].isin(kept_index)]
+    items = items.assign(order_index=position.reindex(items['order_index']).to_numpy())
+    return orders, items
+
+def apply_orders(state, orders, items, raw_item_names=False):
+    # Add one batch of new orders to the running counters, nothing already counted is touched
+    orders, items = unseen_orders(state, orders.reset_index(drop=True), items)
+    if orders.empty:
+        return 0
+    if not raw_item_names:
+        items = canonical_item_names(items)
+    delta = aggregate_items(explode_order_items(orders, items, ['platform', 'day', 'meal_type']), ['platform', 'day', 'meal_type'])
+    counters = state['counters']
+    for key in delta[COUNTER_COLUMNS + ['quantity']].astype({col: str for col in COUNTER_COLUMNS}).itertuples(index=False):
+        counters[key[:-1]] = counters.get(key[:-1], 0) + int(key[-1])
+    state['dirty'] = True
+    return len(orders)
+
+def counter_totals(state, platform=None):
+    # The counters in the item_totals layout aggregate_item_counts_weekday and friends expect
+    totals = pd.DataFrame([key + (quantity,) for key, quantity in state['counters'].items()], columns=COUNTER_COLUMNS + ['quantity'])
+    if platform:
+        totals = totals[totals['platform'] == platform]
+    return aggregate_items(totals, ['day', 'meal_type'])
+
+def order_times(state, platform=None):
+    return pd.to_datetime(pd.Series([
+        ordered_date_time for order_platform, _, ordered_date_time in state['seen_orders']
+        if platform is None or order_platform == platform
+    ], dtype=object), errors='coerce')
+
+def write_reports(state, state_dir, meal_slots, report_format, closures=None):
+    # Every platform together plus one workbook per platform, rebuilt from the counters only
+    written = []
+    for platform in [None, 'zomato', 'swiggy']:
+        name = f'item_counts_{platform}' if platform else 'item_counts'
+        exposure = exposure_for(order_times(state, platform), meal_slots, closures)
+        sheets = zomato_predective_analysis.item_count_sheets(counter_totals(state, platform), meal_slots, exposure)
+        if write_report(sheets, os.path.join(state_dir, f'{name}.xlsx'), report_format):
+            written.append(name)
+    return written
+
+async def ingest_files(state, ready, executor, args, metrics, log):
+    loop = asyncio.get_running_loop()
+    tasks = [
+        loop.run_in_executor(executor, parse_input_file, platform, path, args.meal_slots)
+        for platform, path, _ in ready
+    ]
+    stamps = {path: (platform, stamp) for platform, path, stamp in ready}
+
+    # Apply every file as soon as its worker finishes, invoices are batched per poll
+    order_dicts = []
+    for task in asyncio.as_completed(tasks):
+        path, result, error = await task
+        platform, stamp = stamps[path]
+        state['seen_files'][path] = stamp
+        state['dirty'] = True
+        if error:
+            count(metrics, 'failed_files')
+            log_event(log, 'file_failed', path=path, error=error)
+        elif platform == 'zomato':
+            order_dicts.append(result)
+        else:
+            with timed(metrics, 'apply_swiggy', rows=len(result[0])):
+                applied = apply_orders(state, *result, raw_item_names=args.raw_item_names)
+            count(metrics, 'orders_applied', applied)
+            log_event(log, 'file_applied', path=path, platform=platform, orders=applied)
+
+    if order_dicts:
+        with timed(metrics, 'apply_zomato', rows=len(order_dicts)):
+            applied = apply_orders(state, *zomato_order_tables(order_dicts, args.meal_slots), raw_item_names=args.raw_item_names)
+        count(metrics, 'orders_applied', applied)
+        log_event(log, 'invoices_applied', files=len(order_dicts), orders=applied)
+
+async def watch(args, state, executor, metrics, log):
+    while True:
+        ready = settled_new_files(state, list_input_files(args.zomato_dir, args.swiggy_dir))
+        if ready:
+            start_time = time.perf_counter()
+            await ingest_files(state, ready, executor, args, metrics, log)
+            with timed(metrics, 'report_write'):
+                written = write_reports(state, args.state_dir, args.meal_slots, args.report_format, args.closed)
+            with timed(metrics, 'checkpoint'):
+                save_checkpoint(state, args.state_dir)
+            seconds = time.perf_counter() - start_time
+            log_event(log, 'poll_applied', files=len(ready), reports=written, seconds=round(seconds, 3))
+            print(f'Applied {len(ready)} new files in {seconds:.2f}s, {len(state["seen_orders"])} orders counted')
+        elif args.once and not state['pending_files']:
+            break
+        await asyncio.sleep(args.interval)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Watch the invoice and export folders and keep item counts up to date')
+    parser.add_argument('--zomato-dir', default='zomato_orders', help='Folder Zomato invoice PDFs land in')
+    parser.add_argument('--swiggy-dir', default='swiggy_exports', help='Folder Swiggy exports (.csv/.xlsx) land in')
+    parser.add_argument('--state-dir', default='ingest_state', help='Folder for the counter checkpoint and the reports')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls')
+    parser.add_argument('--workers', type=int, default=0, help='Parser processes, 0 uses every core')
+    parser.add_argument('--once', action='store_true', help='Apply whatever is in the folders, then exit')
+    parser.add_argument('--raw-item-names', action='store_true', help='Count items under their raw names')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='xlsx',
+                        help='xlsx writes one workbook per report, csv/parquet write one file per sheet')
+    parser.add_argument('--meal-slots', type=parse_meal_slots, default=MEAL_SLOTS,
+                        help='Meal slot hours, e.g. BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24')
+    parser.add_argument('--closed', type=parse_closures,
+                        help='Days the outlet was closed, left out of the per-day averages, e.g. Monday,Sunday:BREAKFAST,2023-08-15')
+    parser.add_argument('--log-file', default='ingest_state/run_log.jsonl', help='JSON-lines log, empty to disable')
+    return check_closure_args(parser, parser.parse_args())
+
+def main():
+    args = parse_args()
+    state = load_checkpoint(args.state_dir)
+    metrics = new_metrics()
+    log = open_run_log(args.log_file)
+    log_event(log, 'daemon_start', zomato_dir=args.zomato_dir, swiggy_dir=args.swiggy_dir,
+              orders=len(state['seen_orders']), files=len(state['seen_files']))
+    print(f'Watching {args.zomato_dir} and {args.swiggy_dir}, {len(state["seen_orders"])} orders already counted')
+
+    executor = ProcessPoolExecutor(max_workers=args.workers or os.cpu_count())
+    try:
+        asyncio.run(watch(args, state, executor, metrics, log))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown()
+        if state['dirty']:
+            save_checkpoint(state, args.state_dir)
+        close_run_log(log, metrics)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from order_common.timestamps import MEAL_SLOTS, WEEKDAYS
+
+# 'Monday' / '2023-08-15' / '2023-10-20..2023-10-24', each optionally ':BREAKFAST' for a single meal slot
+CLOSURE_COLUMNS = ['start', 'end', 'weekday', 'meal_slot', 'closure']
+
+
+def parse_closures(spec, meal_slots=None):
+    # 'Sunday:BREAKFAST,2023-08-15,2023-10-20..2023-10-24' -> one row per closure.
+    # The meal slots are only checked when given, --closed is parsed before --meal-slots may be
+    closures = []
+    for closure in (spec or '').split(','):
+        closure = closure.strip()
+        if not closure:
+            continue
+        when, _, meal_slot = closure.partition(':')
+        meal_slot = meal_slot.strip().upper() or None
+        if when.strip().title() in WEEKDAYS:
+            closures.append((None, None, when.strip().title(), meal_slot, closure))
+        else:
+            first, _, last = when.partition('..')
+            closures.append((pd.Timestamp(first.strip()), pd.Timestamp((last or first).strip()), None, meal_slot, closure))
+    closures = pd.DataFrame(closures, columns=CLOSURE_COLUMNS)
+    if meal_slots is not None:
+        check_closure_slots(closures, meal_slots)
+    return closures
+
+def check_closure_slots(closures, meal_slots=MEAL_SLOTS):
+    # A closure naming a meal slot that doesn't exist would otherwise fail deep in the exposure
+    if closures is None:
+        return
+    slot_names = [name for name, _, _ in meal_slots]
+    for meal_slot, closure in closures[['meal_slot', 'closure']].itertuples(index=False):
+        if pd.notna(meal_slot) and meal_slot not in slot_names:
+            raise ValueError(f"Unknown meal slot {meal_slot} in closure '{closure}', expected one of {','.join(slot_names)}")
+
+def check_closure_args(parser, args):
+    # --closed against the --meal-slots of the same command line, reported as a usage error
+    try:
+        check_closure_slots(args.closed, args.meal_slots)
+    except ValueError as error:
+        parser.error(str(error))
+    return args
+
+def weekday_counts(start, end):
+    # Days of each weekday in [start, end], from the length of the range and the weekday it starts on
+    days = (end - start).days + 1
+    counts = np.full(7, max(days, 0) // 7, dtype='int64')
+    if days > 0:
+        counts[(start.weekday() + np.arange(days % 7)) % 7] += 1
+    return counts
+
+def closed_dates(closures, start, end, slot_names):
+    # (weekday, slot) of every dated closure inside the range, a date closed twice is only counted once
+    dated = closures[closures['start'].notna()]
+    if dated.empty:
+        return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+    dates = []
+    slots = []
+    for first, last, meal_slot in zip(dated['start'], dated['end'], dated['meal_slot']):
+        closure_dates = pd.date_range(max(first, start), min(last, end), freq='D')
+        closure_slots = [slot_names.index(meal_slot)] if pd.notna(meal_slot) else range(len(slot_names))
+        for slot in closure_slots:
+            dates.append(closure_dates.to_numpy())
+            slots.append(np.full(len(closure_dates), slot))
+    pairs = pd.DataFrame({'date': np.concatenate(dates), 'slot': np.concatenate(slots)}).drop_duplicates()
+    return pd.DatetimeIndex(pairs['date']).weekday.to_numpy(), pairs['slot'].to_numpy()
+
+def meal_slot_occurrences(start, end, meal_slots=MEAL_SLOTS, closures=None):
+    # Weekday x meal slot -> how many times that slot was open in [start, end]
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    slot_names = [name for name, _, _ in meal_slots]
+    counts = np.repeat(weekday_counts(start, end)[:, None], len(slot_names), axis=1)
+    closures = closures if closures is not None else parse_closures(None)
+    check_closure_slots(closures, meal_slots)
+
+    # Weekly closures, e.g. no breakfast on Sundays
+    weekly_closed = np.zeros_like(counts, dtype=bool)
+    for weekday, meal_slot in closures.loc[closures['weekday'].notna(), ['weekday', 'meal_slot']].itertuples(index=False):
+        weekly_closed[WEEKDAYS.index(weekday), [slot_names.index(meal_slot)] if pd.notna(meal_slot) else slice(None)] = True
+
+    # Dated closures, skipping the ones that fall on an already closed weekday slot
+    weekdays, slots = closed_dates(closures, start, end, slot_names)
+    open_pairs = ~weekly_closed[weekdays, slots]
+    np.subtract.at(counts, (weekdays[open_pairs], slots[open_pairs]), 1)
+    counts[weekly_closed] = 0
+    return pd.DataFrame(counts, index=pd.Index(WEEKDAYS, name='ordered_day'), columns=pd.Index(slot_names, name='ordered_type'))
+
+def weekday_occurrences(start, end, closures=None):
+    # Weekday -> open days in [start, end], only whole-day closures take a day away
+    if closures is not None:
+        closures = closures[closures['meal_slot'].isna()]
+    day_counts = meal_slot_occurrences(start, end, [('DAY', 0, 24)], closures)['DAY']
+    return day_counts.rename('occurrences')
+
+def calendar_exposure(start, end, meal_slots=MEAL_SLOTS, closures=None):
+    return {
+        'start': pd.Timestamp(start).normalize(),
+        'end': pd.Timestamp(end).normalize(),
+        'days': weekday_occurrences(start, end, closures),
+        'slots': meal_slot_occurrences(start, end, meal_slots, closures),
+    }
+
+def exposure_for(timestamps, meal_slots=MEAL_SLOTS, closures=None, start=None, end=None):
+    # Exposure over the range the orders cover unless a range is given, None without any dated order
+    timestamps = pd.Series(timestamps).dropna()
+    if timestamps.empty and (start is None or end is None):
+        return None
+    return calendar_exposure(start if start is not None else timestamps.min(),
+                             end if end is not None else timestamps.max(), meal_slots, closures)
+
+def occurrences_for(exposure, weekdays, meal_slots=None):
+    # Open occurrences for every (weekday[, meal slot]) row, NaN for UNKNOWN slots or rows without a weekday
+    weekdays = pd.Series(weekdays).astype(object)
+    if meal_slots is None:
+        return weekdays.map(exposure['days']).astype('float64').to_numpy()
+    slot_counts = exposure['slots'].stack()
+    keys = pd.MultiIndex.from_arrays([weekdays, pd.Series(meal_slots).astype(object)])
+    return slot_counts.reindex(keys).astype('float64').to_numpy()
+
+def average_per_occurrence(quantity, occurrences):
+    quantity = np.asarray(quantity, dtype='float64')
+    return np.divide(quantity, occurrences, out=np.full(len(quantity), np.nan), where=occurrences > 0).round(2)
+
+def with_occurrence_averages(totals, exposure, quantity_column='quantity'):
+    # Adds 'occurrences' and 'avg_<quantity>' from the row's weekday, and meal slot when the totals have one
+    if exposure is None or 'ordered_day' not in totals.columns:
+        return totals
+    meal_slots = totals['ordered_type'] if 'ordered_type' in totals.columns else None
+    occurrences = occurrences_for(exposure, totals['ordered_day'], meal_slots)
+    return totals.assign(**{
+        'occurrences': occurrences,
+        f'avg_{quantity_column}': average_per_occurrence(totals[quantity_column], occurrences),
+    })
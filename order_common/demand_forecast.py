@@ -0,0 +1,238 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from order_common.instrumentation import add_stage, count
+from order_common.item_aggregation import aggregate_items, explode_order_items
+
+SEASON_LENGTH = 7
+# Smoothing weights for the level and for the weekday profile
+DEFAULT_ALPHA = 0.3
+DEFAULT_GAMMA = 0.2
+
+# One forecast series per item and meal slot
+SERIES_COLUMNS = ['item_name', 'ordered_type']
+MODELS = ['smoothing', 'seasonal_naive']
+
+
+def daily_item_history(orders, items):
+    # Quantity per (date, meal slot, item), only the days an item sold
+    daily = aggregate_items(explode_order_items(orders, items, ['date', 'meal_type']), ['date', 'meal_type'])
+    daily = daily[daily['ordered_date'].notna()]
+    return daily.astype({col: str for col in SERIES_COLUMNS})
+
+def series_keys(daily, known_keys=None):
+    # Series already in the fitted state keep their row, new items are appended
+    keys = pd.MultiIndex.from_frame(daily[SERIES_COLUMNS]).unique()
+    if known_keys is None:
+        return keys.sort_values()
+    return known_keys.append(keys.difference(known_keys).sort_values())
+
+def history_matrix(daily, keys, first_date, last_date):
+    # series x day quantity matrix with a column for every calendar day, days without sales are 0
+    dates = pd.date_range(first_date, last_date, freq='D')
+    if dates.empty:
+        return np.zeros((len(keys), 0)), dates
+    daily = daily[(daily['ordered_date'] >= first_date) & (daily['ordered_date'] <= last_date)]
+    matrix = np.zeros((len(keys), len(dates)))
+    rows = keys.get_indexer(pd.MultiIndex.from_frame(daily[SERIES_COLUMNS]))
+    cols = (daily['ordered_date'] - dates[0]).dt.days.to_numpy()
+    np.add.at(matrix, (rows, cols), daily['quantity'].to_numpy(dtype='float64'))
+    return matrix, dates
+
+def new_forecast_state(keys, alpha=DEFAULT_ALPHA, gamma=DEFAULT_GAMMA):
+    return {
+        'keys': keys,
+        'level': np.zeros(len(keys)),
+        # Weekday profile and last week's actuals, both indexed by weekday (Monday = 0)
+        'season': np.zeros((len(keys), SEASON_LENGTH)),
+        'recent': np.zeros((len(keys), SEASON_LENGTH)),
+        # Backtest accumulators, one column per model
+        'abs_error': np.zeros((len(keys), len(MODELS))),
+        'actual': np.zeros(len(keys)),
+        'days_seen': 0,
+        'last_date': None,
+        'alpha': alpha,
+        'gamma': gamma,
+    }
+
+def add_series(state, keys):
+    # Items first sold after the last fit start from an all-zero history, as a full refit would
+    new_count = len(keys) - len(state['keys'])
+    if new_count:
+        state['level'] = np.concatenate([state['level'], np.zeros(new_count)])
+        for name in ['season', 'recent', 'abs_error']:
+            state[name] = np.vstack([state[name], np.zeros((new_count, state[name].shape[1]))])
+        state['actual'] = np.concatenate([state['actual'], np.zeros(new_count)])
+    state['keys'] = keys
+    return state
+
+def update_forecast_state(state, matrix, dates):
+    # One step per day, every series updated at once
+    alpha = state['alpha']
+    gamma = state['gamma']
+    level = state['level']
+    season = state['season']
+    recent = state['recent']
+    for day, date in enumerate(dates):
+        weekday = date.weekday()
+        actual = matrix[:, day]
+
+        # One-step-ahead backtest once a full week of history has been seen
+        if state['days_seen'] >= SEASON_LENGTH:
+            smoothing_forecast = np.maximum(level + season[:, weekday], 0)
+            state['abs_error'][:, 0] += np.abs(actual - smoothing_forecast)
+            state['abs_error'][:, 1] += np.abs(actual - recent[:, weekday])
+            state['actual'] += actual
+
+        level = alpha * (actual - season[:, weekday]) + (1 - alpha) * level
+        season[:, weekday] = gamma * (actual - level) + (1 - gamma) * season[:, weekday]
+        recent[:, weekday] = actual
+        state['days_seen'] += 1
+
+    state['level'] = level
+    if len(dates):
+        state['last_date'] = dates[-1]
+    return state
+
+def forecast_days(state, days=7):
+    # Daily forecast per series for the days after the last fitted day
+    dates = pd.date_range(state['last_date'] + pd.Timedelta(days=1), periods=days, freq='D')
+    weekdays = dates.weekday.to_numpy()
+    smoothing = np.maximum(state['level'][:, None] + state['season'][:, weekdays], 0)
+    seasonal_naive = state['recent'][:, weekdays]
+
+    keys = state['keys'].to_frame(index=False)
+    forecast = pd.DataFrame({
+        'ordered_date': np.tile(dates, len(keys)),
+        'ordered_day': np.tile(dates.day_name(), len(keys)),
+        'ordered_type': np.repeat(keys['ordered_type'].to_numpy(), days),
+        'item_name': np.repeat(keys['item_name'].to_numpy(), days),
+        'forecast_quantity': smoothing.ravel().round(1),
+        'seasonal_naive': seasonal_naive.ravel(),
+    })
+    forecast = forecast[(forecast['forecast_quantity'] > 0) | (forecast['seasonal_naive'] > 0)]
+    return forecast.sort_values(['ordered_date', 'forecast_quantity'], ascending=[True, False]).reset_index(drop=True)
+
+def wape(abs_error, actual):
+    # Weighted absolute percentage error, NaN for series that never sold in the backtest window
+    return np.divide(abs_error, actual, out=np.full_like(abs_error, np.nan), where=actual > 0).round(3)
+
+def backtest_report(state):
+    keys = state['keys'].to_frame(index=False)
+    report = keys.assign(
+        actual=state['actual'],
+        smoothing_wape=wape(state['abs_error'][:, 0], state['actual']),
+        seasonal_naive_wape=wape(state['abs_error'][:, 1], state['actual']),
+    )
+    report = report[report['actual'] > 0].sort_values('actual', ascending=False).reset_index(drop=True)
+
+    # Overall error across all series on the first row
+    total = state['actual'].sum()
+    overall = pd.DataFrame([{
+        'item_name': 'ALL ITEMS',
+        'ordered_type': 'ALL',
+        'actual': total,
+        'smoothing_wape': wape(state['abs_error'][:, 0].sum(), total),
+        'seasonal_naive_wape': wape(state['abs_error'][:, 1].sum(), total),
+    }])
+    return pd.concat([overall, report], ignore_index=True)
+
+def save_forecast_state(state, state_path):
+    state_dir = os.path.dirname(state_path)
+    if state_dir and not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+    state_df = state['keys'].to_frame(index=False)
+    state_df['level'] = state['level']
+    for weekday in range(SEASON_LENGTH):
+        state_df[f'season_{weekday}'] = state['season'][:, weekday]
+        state_df[f'recent_{weekday}'] = state['recent'][:, weekday]
+    for model_index, model in enumerate(MODELS):
+        state_df[f'{model}_abs_error'] = state['abs_error'][:, model_index]
+    state_df['actual'] = state['actual']
+    # Run level values are repeated on every row
+    state_df['days_seen'] = state['days_seen']
+    state_df['last_date'] = state['last_date']
+    state_df['alpha'] = state['alpha']
+    state_df['gamma'] = state['gamma']
+    state_df.to_parquet(state_path, index=False)
+
+def load_forecast_state(state_path):
+    if not os.path.exists(state_path):
+        return None
+    state_df = pd.read_parquet(state_path)
+    if state_df.empty:
+        return None
+    state = new_forecast_state(pd.MultiIndex.from_frame(state_df[SERIES_COLUMNS]), state_df['alpha'].iloc[0], state_df['gamma'].iloc[0])
+    # Copied, the columns are read-only views and update_forecast_state writes into the arrays
+    state['level'] = state_df['level'].to_numpy(dtype='float64', copy=True)
+    state['season'] = state_df[[f'season_{weekday}' for weekday in range(SEASON_LENGTH)]].to_numpy(dtype='float64', copy=True)
+    state['recent'] = state_df[[f'recent_{weekday}' for weekday in range(SEASON_LENGTH)]].to_numpy(dtype='float64', copy=True)
+    state['abs_error'] = state_df[[f'{model}_abs_error' for model in MODELS]].to_numpy(dtype='float64', copy=True)
+    state['actual'] = state_df['actual'].to_numpy(dtype='float64', copy=True)
+    state['days_seen'] = int(state_df['days_seen'].iloc[0])
+    state['last_date'] = pd.Timestamp(state_df['last_date'].iloc[0])
+    return state
+
+def copy_forecast_state(state):
+    # update_forecast_state changes the arrays in place
+    return {name: value.copy() if isinstance(value, np.ndarray) else value for name, value in state.items()}
+
+def fit_forecast_state(daily, state_path=None, alpha=DEFAULT_ALPHA, gamma=DEFAULT_GAMMA, rebuild=False):
+    # Fit from scratch, or only feed the days after the cached state's last day.
+    # The last day of the history may still be getting orders, so the cached state stops the day
+    # before it and the last day is fitted again on every run
+    history_end = daily['ordered_date'].max()
+    settled_end = history_end - pd.Timedelta(days=1)
+    state = None if rebuild or state_path is None else load_forecast_state(state_path)
+    if state is not None and (
+        state['alpha'] != alpha or state['gamma'] != gamma or state['last_date'] > settled_end
+        or not state['keys'].isin(series_keys(daily)).all()
+    ):
+        # Different parameters, a rebuilt store or renamed items, the cached state no longer matches
+        state = None
+
+    if state is None:
+        state = new_forecast_state(series_keys(daily), alpha, gamma)
+        first_date = daily['ordered_date'].min()
+    else:
+        # Orders added for days already fitted are only picked up by a rebuild
+        state = add_series(state, series_keys(daily, state['keys']))
+        first_date = state['last_date'] + pd.Timedelta(days=1)
+
+    matrix, dates = history_matrix(daily, state['keys'], first_date, settled_end)
+    state = update_forecast_state(state, matrix, dates)
+    if state_path is not None and state['last_date'] is not None:
+        save_forecast_state(state, state_path)
+
+    last_matrix, last_dates = history_matrix(daily, state['keys'], max(first_date, history_end), history_end)
+    state = update_forecast_state(copy_forecast_state(state), last_matrix, last_dates)
+    return state, len(dates) + len(last_dates)
+
+def forecast_demand(orders, items, state_path=None, days=7, alpha=DEFAULT_ALPHA, gamma=DEFAULT_GAMMA, rebuild=False, metrics=None):
+    start_time = time.perf_counter()
+    daily = daily_item_history(orders, items)
+    if daily.empty:
+        return None
+    state, new_days = fit_forecast_state(daily, state_path, alpha, gamma, rebuild)
+    forecast = forecast_days(state, days)
+    add_stage(metrics, 'forecast', time.perf_counter() - start_time, len(state['keys']))
+    count(metrics, 'forecast_new_days', new_days)
+    return {'forecast': forecast, 'first_date': state['last_date'] + pd.Timedelta(days=1), 'backtest': backtest_report(state)}
+
+def forecast_sheets(result):
+    # Next day per item and meal slot, next week summed, and the backtest error
+    forecast = result['forecast']
+    next_day = forecast[forecast['ordered_date'] == result['first_date']]
+    next_week = (
+        forecast.groupby(SERIES_COLUMNS, sort=False)[['forecast_quantity', 'seasonal_naive']].sum()
+        .reset_index()
+    )
+    return {
+        'next_day': next_day,
+        'next_week': next_week.sort_values('forecast_quantity', ascending=False).round(1),
+        'daily': forecast,
+        'backtest': result['backtest'],
+    }
@@ -0,0 +1,99 @@
+import cProfile
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+
+def new_metrics():
+    # stage -> calls/seconds/rows, plus free-form counters such as per-field failures
+    return {'stages': {}, 'counters': {}}
+
+def add_stage(metrics, stage, seconds, rows=0, calls=1):
+    if metrics is None:
+        return
+    totals = metrics['stages'].setdefault(stage, {'calls': 0, 'seconds': 0.0, 'rows': 0})
+    totals['calls'] += calls
+    totals['seconds'] += seconds
+    totals['rows'] += rows
+
+def count(metrics, counter, amount=1):
+    if metrics is None:
+        return
+    metrics['counters'][counter] = metrics['counters'].get(counter, 0) + int(amount)
+
+@contextmanager
+def timed(metrics, stage, rows=0):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(metrics, stage, time.perf_counter() - start_time, rows)
+
+def merge_metrics(metrics, other):
+    # Fold the metrics a worker process sent back into the run's metrics
+    if metrics is None or other is None:
+        return
+    for stage, totals in other['stages'].items():
+        add_stage(metrics, stage, totals['seconds'], totals['rows'], totals['calls'])
+    for counter, amount in other['counters'].items():
+        count(metrics, counter, amount)
+
+def metrics_summary(metrics):
+    stages = pd.DataFrame(
+        [{'stage': stage, **totals} for stage, totals in metrics['stages'].items()],
+        columns=['stage', 'calls', 'seconds', 'rows'],
+    )
+    stages['rows_per_sec'] = (stages['rows'] / stages['seconds'].where((stages['seconds'] > 0) & (stages['rows'] > 0))).round(1)
+    stages['seconds'] = stages['seconds'].round(4)
+    return stages
+
+def print_run_summary(metrics, title='Run summary'):
+    print(title)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(metrics_summary(metrics).to_string(index=False))
+    for counter, amount in sorted(metrics['counters'].items()):
+        print(f'  {counter}: {amount}')
+
+def open_run_log(log_path):
+    # One JSON object per line, appended so earlier runs stay in the file
+    if not log_path:
+        return None
+    log_dir = os.path.dirname(log_path)
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+    return open(log_path, 'a', encoding='utf-8')
+
+def log_event(log, event, **fields):
+    if log is None:
+        return
+    record = {'time': datetime.now().isoformat(timespec='milliseconds'), 'event': event, **fields}
+    log.write(json.dumps(record, default=str) + '\n')
+
+def close_run_log(log, metrics=None):
+    if log is None:
+        return
+    if metrics is not None:
+        log_event(log, 'run_summary', stages=metrics['stages'], counters=metrics['counters'])
+    log.close()
+
+@contextmanager
+def profiled(profile_path):
+    # cProfile stats of the main process, readable by pstats, snakeviz or flameprof
+    if not profile_path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profile_dir = os.path.dirname(profile_path)
+        if profile_dir and not os.path.exists(profile_dir):
+            os.makedirs(profile_dir)
+        profiler.dump_stats(profile_path)
+        print(f'Profile written to {profile_path}')
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from order_common.order_store import items_with_orders
+
+# Report dimensions and the long table column each one groups on
+DIMENSIONS = {
+    'day': 'ordered_day',
+    'meal_type': 'ordered_type',
+    'hour': 'ordered_hour',
+    'week': 'ordered_week',
+    'date': 'ordered_date',
+    'platform': 'platform',
+    'order': 'order_index',
+}
+
+ITEM_COLUMN = 'item_name'
+QUANTITY_COLUMN = 'quantity'
+
+
+def dimension_columns(dimensions):
+    return [DIMENSIONS.get(dimension, dimension) for dimension in dimensions]
+
+def explode_order_items(orders, items, dimensions=('day', 'meal_type')):
+    # One row per (order, item, qty) with the requested order dimensions attached
+    columns = dimension_columns(dimensions)
+    order_columns = [col for col in columns if col in orders.columns and col not in items.columns]
+    derived_columns = [col for col in columns if col not in orders.columns and col not in items.columns]
+    if derived_columns:
+        order_columns.append('ordered_date_time')
+    long_items = items_with_orders(orders, items, order_columns)
+
+    if derived_columns:
+        ordered_date_time = long_items.pop('ordered_date_time')
+        if 'ordered_hour' in derived_columns:
+            long_items['ordered_hour'] = ordered_date_time.dt.hour
+        if 'ordered_date' in derived_columns:
+            long_items['ordered_date'] = ordered_date_time.dt.normalize()
+        if 'ordered_week' in derived_columns:
+            # Weeks are labelled by their Monday
+            long_items['ordered_week'] = (ordered_date_time - pd.to_timedelta(ordered_date_time.dt.weekday, unit='D')).dt.normalize()
+    return long_items
+
+def aggregate_items(long_items, dimensions=('day', 'meal_type')):
+    # Every count for every combination of dimensions in a single groupby
+    group_columns = dimension_columns(dimensions) + [ITEM_COLUMN]
+    return (
+        long_items.groupby(group_columns, observed=True, sort=False)[QUANTITY_COLUMN].sum()
+        .reset_index()
+    )
+
+def rollup(aggregate, dimensions):
+    # Re-aggregate an existing result to a coarser set of dimensions without touching the orders
+    return aggregate_items(aggregate, dimensions)
+
+def split_aggregate(aggregate, dimensions):
+    # Yield one (key, frame) pair per combination, e.g. ('Monday', 'LUNCH') -> item counts
+    group_columns = dimension_columns(dimensions)
+    for key, group in aggregate.groupby(group_columns, observed=True, sort=False):
+        yield key, group.drop(columns=group_columns).sort_values(QUANTITY_COLUMN, ascending=False).reset_index(drop=True)
@@ -0,0 +1,199 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Shared by both pipelines so the same dish gets the same id on every platform
+MENU_DIR = os.path.join(REPO_DIR, 'menu')
+CANONICAL_CACHE = os.path.join(MENU_DIR, 'item_canonical.parquet')
+OVERRIDES_FILE = os.path.join(MENU_DIR, 'item_overrides.csv')
+
+CACHE_COLUMNS = ['raw_name', 'item_id', 'canonical_name', 'variant', 'overrides_hash']
+
+# 'Upma, Choice Of Curry & Chutney' -> the choice list is variant text
+CHOICE_PATTERN = re.compile(r',?\s*\bchoice of\b', re.IGNORECASE)
+# '[Serves 1]', '(6 Pcs)' -> variant text wherever they appear in the name
+BRACKET_PATTERN = re.compile(r'\s*[\[(]([^\])]*)[\])]\s*')
+NON_WORD_PATTERN = re.compile(r'[^0-9a-z]+')
+
+# A fuzzy match needs the whole name and every word to be close, so 'Veg Thali' never becomes 'Egg Thali'
+NAME_SIMILARITY = 0.8
+TOKEN_SIMILARITY = 0.4
+
+
+def split_variant(raw_name):
+    # 'Odisha Special Economic Egg Curry Thali [Serves 1] Choice Of Egg Curry ...'
+    # -> ('Odisha Special Economic Egg Curry Thali', 'Serves 1; Choice Of Egg Curry ...')
+    name = ' '.join(str(raw_name).replace('_', ' ').split())
+    variants = []
+    choice = CHOICE_PATTERN.search(name)
+    if choice:
+        variants.append(name[choice.start():].lstrip(', '))
+        name = name[:choice.start()]
+    variants = [part.strip() for part in BRACKET_PATTERN.findall(name)] + variants
+    base_name = BRACKET_PATTERN.sub(' ', name).strip(' ,')
+    return ' '.join(base_name.split()) or name, '; '.join(part for part in variants if part)
+
+def name_key(name):
+    # Case, punctuation and apostrophes don't tell dishes apart
+    return ' '.join(NON_WORD_PATTERN.sub(' ', str(name).lower().replace("'", '')).split())
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+def dice(left, right):
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+def tokens_match(key, candidate_key):
+    # Every word needs a close counterpart, e.g. 'economic' ~ 'economy', 'veg' !~ 'egg'
+    tokens = key.split()
+    candidate_tokens = candidate_key.split()
+    if len(tokens) != len(candidate_tokens):
+        return False
+    remaining = list(candidate_tokens)
+    for token in tokens:
+        scores = [1.0 if token == other else dice(trigrams(token), trigrams(other)) for other in remaining]
+        best = int(np.argmax(scores))
+        if scores[best] < TOKEN_SIMILARITY:
+            return False
+        remaining.pop(best)
+    return True
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return ''
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def read_overrides(overrides_path):
+    # raw_name,canonical_name rows, raw_name matches the exact raw text or its base name
+    if not os.path.exists(overrides_path):
+        return {}
+    overrides_df = pd.read_csv(overrides_path, dtype=str).dropna()
+    overrides = {}
+    for raw_name, canonical_name in zip(overrides_df['raw_name'], overrides_df['canonical_name']):
+        overrides[raw_name.strip()] = canonical_name.strip()
+        overrides[name_key(raw_name)] = canonical_name.strip()
+    return overrides
+
+def new_canonical_index(overrides=None, overrides_hash=''):
+    return {
+        # raw name -> (item id, canonical name, variant), the only lookup once a name has been seen
+        'memo': {},
+        # item id -> canonical name, and trigram -> item ids for fuzzy candidates
+        'names': {},
+        'trigrams': defaultdict(set),
+        'overrides': overrides or {},
+        'overrides_hash': overrides_hash,
+        'dirty': False,
+    }
+
+def add_canonical_item(index, item_id, canonical_name):
+    if item_id not in index['names']:
+        index['names'][item_id] = canonical_name
+        for trigram in trigrams(item_id):
+            index['trigrams'][trigram].add(item_id)
+
+def fuzzy_item_id(index, key):
+    # Only items sharing a trigram with the name are scored
+    key_trigrams = trigrams(key)
+    candidate_counts = defaultdict(int)
+    for trigram in key_trigrams:
+        for item_id in index['trigrams'].get(trigram, ()):
+            candidate_counts[item_id] += 1
+
+    best_item_id = None
+    best_score = NAME_SIMILARITY
+    for item_id, shared in candidate_counts.items():
+        score = 2 * shared / (len(key_trigrams) + len(trigrams(item_id)))
+        if score >= best_score and tokens_match(key, item_id):
+            best_item_id = item_id
+            best_score = score
+    return best_item_id
+
+def resolve_item(index, raw_name):
+    cached = index['memo'].get(raw_name)
+    if cached is not None:
+        return cached
+
+    base_name, variant = split_variant(raw_name)
+    override = index['overrides'].get(raw_name.strip()) or index['overrides'].get(name_key(base_name))
+    if override:
+        item_id = name_key(override)
+        add_canonical_item(index, item_id, override)
+    else:
+        item_id = name_key(base_name)
+        if item_id not in index['names']:
+            item_id = fuzzy_item_id(index, item_id) or item_id
+        add_canonical_item(index, item_id, base_name)
+
+    resolved = (item_id, index['names'][item_id], variant)
+    index['memo'][raw_name] = resolved
+    index['dirty'] = True
+    return resolved
+
+def load_canonical_index(cache_path=CANONICAL_CACHE, overrides_path=OVERRIDES_FILE):
+    overrides_hash = file_hash(overrides_path)
+    index = new_canonical_index(read_overrides(overrides_path), overrides_hash)
+    if not os.path.exists(cache_path):
+        return index
+
+    cache_df = pd.read_parquet(cache_path)
+    # Canonical ids and names survive an override edit, the raw name mappings are worked out again
+    for item_id, canonical_name in zip(cache_df['item_id'], cache_df['canonical_name']):
+        add_canonical_item(index, item_id, canonical_name)
+    if not cache_df.empty and cache_df['overrides_hash'].iloc[0] == overrides_hash:
+        index['memo'] = {
+            raw_name: (item_id, canonical_name, variant)
+            for raw_name, item_id, canonical_name, variant in zip(
+                cache_df['raw_name'], cache_df['item_id'], cache_df['canonical_name'], cache_df['variant']
+            )
+        }
+    else:
+        index['dirty'] = True
+    return index
+
+def save_canonical_index(index, cache_path=CANONICAL_CACHE):
+    if not index['dirty']:
+        return
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir and not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    rows = [(raw_name,) + resolved + (index['overrides_hash'],) for raw_name, resolved in index['memo'].items()]
+    # Outlets processed in parallel share the cache, a reader never sees another process's half written file
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    pd.DataFrame(rows, columns=CACHE_COLUMNS).to_parquet(temp_path, index=False)
+    os.replace(temp_path, cache_path)
+    index['dirty'] = False
+
+def canonicalize_items(items, index):
+    # Resolve each distinct name once, then spread the result to every row by category code
+    raw_names = items['item_name'].astype('category')
+    resolved = [resolve_item(index, str(raw_name)) for raw_name in raw_names.cat.categories]
+    codes = raw_names.cat.codes.to_numpy()
+
+    def take(position):
+        values = np.array([entry[position] for entry in resolved] + [None], dtype=object)
+        return pd.Categorical(values[codes])
+
+    return items.assign(
+        raw_item_name=raw_names.to_numpy(),
+        item_id=take(0),
+        item_name=take(1),
+        variant=take(2),
+    )
+
+def canonical_item_names(items, cache_path=CANONICAL_CACHE, overrides_path=OVERRIDES_FILE):
+    # Load the persisted mappings, canonicalize, and save anything new for the next run
+    index = load_canonical_index(cache_path, overrides_path)
+    items = canonicalize_items(items, index)
+    save_canonical_index(index, cache_path)
+    return items
@@ -0,0 +1,224 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from order_common.instrumentation import count
+from order_common.order_store import ITEM_COLUMNS, ITEMS_FILE, ORDER_COLUMNS, ORDERS_FILE, normalize_items, normalize_orders
+
+# The order store partitioned by month and day: one folder per month, month=2023-08/, holding
+# orders.parquet and order_items.parquet with one row group per day. Orders without a readable time
+# go to undated/. A day's items point at their order's row within that day, so any set of days
+# can be read on its own.
+# partitions.parquet holds one row per day with its row counts and min/max statistics, a query
+# decides from it alone which months to open and which day row groups to decode
+PARTITIONS_FILE = 'partitions.parquet'
+UNDATED_PARTITION = 'undated'
+PARTITION_STATS = [
+    'month', 'row_group', 'item_row_group', 'ordered_date', 'orders', 'items',
+    'min_ordered_date_time', 'max_ordered_date_time', 'min_ordered_hour', 'max_ordered_hour',
+    'weekdays', 'meal_types', 'fingerprint',
+]
+
+# Order column each filter reads
+FILTER_COLUMNS = {'start': 'ordered_date_time', 'end': 'ordered_date_time', 'weekday': 'ordered_day', 'meal_slot': 'ordered_type'}
+
+
+def history_exists(history_dir):
+    return os.path.exists(os.path.join(history_dir, PARTITIONS_FILE))
+
+def read_partitions(history_dir):
+    return pd.read_parquet(os.path.join(history_dir, PARTITIONS_FILE))
+
+def day_runs(orders):
+    # orders sorted by time as the order store holds them, so every day is one contiguous run of rows
+    dates = orders['ordered_date_time'].dt.normalize()
+    days = dates.dt.strftime('%Y-%m-%d').fillna(UNDATED_PARTITION).to_numpy()
+    months = dates.dt.strftime('month=%Y-%m').fillna(UNDATED_PARTITION).to_numpy()
+    run_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.empty(0, dtype='int64')
+    run_ends = np.r_[run_starts[1:], len(days)].astype('int64')
+    return months[run_starts], run_starts, run_ends
+
+def present_values(values, order_day, days):
+    # 'Friday' / 'BREAKFAST,LUNCH', the set of values each day holds, for pruning
+    codes, uniques = pd.factorize(values.astype(str).where(values.notna()), sort=True)
+    present = np.zeros((days, len(uniques)), dtype=bool)
+    present[order_day[codes >= 0], codes[codes >= 0]] = True
+    return [','.join(uniques[row]) for row in present]
+
+def day_stats(orders, items, months, run_starts, run_ends):
+    # One row per day, every statistic from whole-column operations over the runs
+    days = len(run_starts)
+    order_day = np.repeat(np.arange(days), run_ends - run_starts)
+    item_day = order_day[items['order_index'].to_numpy()]
+    day_items = np.bincount(item_day, minlength=days)
+    # Sum of the row hashes per day, wrapping in uint64. Items are hashed with their day-local order_index
+    fingerprints = np.zeros(days, dtype='uint64')
+    np.add.at(fingerprints, order_day, pd.util.hash_pandas_object(orders, index=False).to_numpy())
+    np.add.at(fingerprints, item_day, pd.util.hash_pandas_object(
+        items.assign(order_index=items['order_index'].to_numpy() - run_starts[item_day]), index=False).to_numpy())
+    # Sorted by time, a day's first and last order are its min and max
+    first_times = orders['ordered_date_time'].to_numpy()[run_starts]
+    last_times = orders['ordered_date_time'].to_numpy()[run_ends - 1]
+
+    stats = pd.DataFrame({
+        'month': months,
+        'row_group': 0,
+        'item_row_group': -1,
+        'ordered_date': pd.DatetimeIndex(first_times).normalize(),
+        'orders': run_ends - run_starts,
+        'items': day_items,
+        'min_ordered_date_time': first_times,
+        'max_ordered_date_time': last_times,
+        'min_ordered_hour': pd.DatetimeIndex(first_times).hour,
+        'max_ordered_hour': pd.DatetimeIndex(last_times).hour,
+        'weekdays': present_values(orders['ordered_day'], order_day, days),
+        'meal_types': present_values(orders['ordered_type'], order_day, days),
+        'fingerprint': fingerprints,
+    })
+    # Row group of each day within its month's files, days without items have no item row group
+    stats['row_group'] = stats.groupby('month', sort=False).cumcount()
+    has_items = stats['items'] > 0
+    stats['item_row_group'] = has_items.astype('int64').groupby(stats['month'], sort=False).cumsum().where(has_items, 0) - 1
+    return stats
+
+def write_row_groups(df, lengths, path):
+    # One row group per day, written next to the old file and swapped in like the cube
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path + '.tmp', table.schema) as writer:
+        offset = 0
+        for length in lengths:
+            if length:
+                writer.write_table(table.slice(offset, length))
+            offset += length
+        if not len(df):
+            writer.write_table(table)
+    os.replace(path + '.tmp', path)
+
+def write_order_history(history_dir, orders, items, metrics=None):
+    # orders/items as the order store holds them: orders sorted by time, items sorted by order_index.
+    # Only the months holding a day whose orders changed since the last write are written again
+    old_stats = read_partitions(history_dir) if history_exists(history_dir) else pd.DataFrame(columns=PARTITION_STATS)
+    old_fingerprints = old_stats.groupby('month', sort=False)['fingerprint'].agg(list).to_dict()
+
+    months, run_starts, run_ends = day_runs(orders)
+    stats = day_stats(orders, items, months, run_starts, run_ends)
+    item_order_index = items['order_index'].to_numpy()
+
+    written = 0
+    for month, month_stats in stats.groupby('month', sort=False):
+        if old_fingerprints.get(month) == list(month_stats['fingerprint']):
+            continue
+        days = month_stats.index.to_numpy()
+        first, last = run_starts[days[0]], run_ends[days[-1]]
+        item_first, item_last = np.searchsorted(item_order_index, [first, last])
+        # Items point at their order's row within the day
+        month_items = items.iloc[item_first:item_last].reset_index(drop=True)
+        item_day = np.repeat(days, month_stats['items'].to_numpy())
+        month_items['order_index'] = month_items['order_index'].to_numpy() - run_starts[item_day]
+
+        month_dir = os.path.join(history_dir, month)
+        if not os.path.exists(month_dir):
+            os.makedirs(month_dir)
+        write_row_groups(orders.iloc[first:last], month_stats['orders'].to_numpy(), os.path.join(month_dir, ORDERS_FILE))
+        write_row_groups(month_items, month_stats['items'].to_numpy(), os.path.join(month_dir, ITEMS_FILE))
+        written += 1
+
+    # Months that no longer have any order
+    for month in set(old_fingerprints) - set(months):
+        shutil.rmtree(os.path.join(history_dir, month), ignore_errors=True)
+
+    if not os.path.exists(history_dir):
+        os.makedirs(history_dir)
+    stats_path = os.path.join(history_dir, PARTITIONS_FILE)
+    stats.to_parquet(stats_path + '.tmp', index=False)
+    os.replace(stats_path + '.tmp', stats_path)
+    count(metrics, 'history_months_written', written)
+    return written
+
+def history_date_range(history_dir):
+    # First and last order time from the partition statistics, without opening a month
+    stats = read_partitions(history_dir)
+    return stats['min_ordered_date_time'].min(), stats['max_ordered_date_time'].max()
+
+def holds_any(values, selected):
+    # Days whose comma separated value set shares something with the selection
+    selected = set(selected)
+    return values.str.split(',').map(lambda day_values: not selected.isdisjoint(day_values)).to_numpy(dtype=bool)
+
+def select_days(stats, start=None, end=None, weekday=None, meal_slot=None):
+    # start is inclusive and end exclusive. A date range leaves out the undated orders
+    mask = np.ones(len(stats), dtype=bool)
+    if start is not None:
+        mask &= (stats['max_ordered_date_time'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (stats['min_ordered_date_time'] < pd.Timestamp(end)).to_numpy()
+    if weekday:
+        mask &= holds_any(stats['weekdays'], weekday)
+    if meal_slot:
+        mask &= holds_any(stats['meal_types'], meal_slot)
+    return stats[mask]
+
+def order_mask(orders, start=None, end=None, weekday=None, meal_slot=None):
+    # Row filter for the orders of the selected days, which may still straddle the range or mix slots
+    mask = np.ones(len(orders), dtype=bool)
+    if start is not None:
+        mask &= (orders['ordered_date_time'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (orders['ordered_date_time'] < pd.Timestamp(end)).to_numpy()
+    if weekday:
+        mask &= orders['ordered_day'].astype(str).isin(weekday).to_numpy()
+    if meal_slot:
+        mask &= orders['ordered_type'].astype(str).isin(meal_slot).to_numpy()
+    return mask
+
+def read_row_groups(history_dir, days, filename, row_group_column, columns):
+    # The selected day row groups as one frame, each month file opened once
+    months = days['month'].to_numpy()
+    row_groups = days[row_group_column].to_numpy()
+    month_starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]]) if len(months) else []
+    tables = []
+    for first, last in zip(month_starts, np.r_[month_starts[1:], len(months)].astype('int64')):
+        month_row_groups = row_groups[first:last]
+        month_row_groups = month_row_groups[month_row_groups >= 0].tolist()
+        if month_row_groups:
+            tables.append(pq.ParquetFile(os.path.join(history_dir, months[first], filename)).read_row_groups(month_row_groups, columns))
+    if not tables:
+        return None
+    # Every month has its own dictionaries, they are unified once for all of them
+    return pa.concat_tables(tables, promote_options='permissive').unify_dictionaries().to_pandas()
+
+def load_order_history(history_dir, start=None, end=None, weekday=None, meal_slot=None,
+                       order_columns=None, item_columns=None, with_items=True, metrics=None):
+    # Orders (and their items) of the selected range, weekdays and meal slots. Only the days the statistics
+    # can't rule out are decoded, and only the requested columns. Items point at their order's row in the
+    # returned orders, as in the order store
+    filters = {'start': start, 'end': end, 'weekday': weekday, 'meal_slot': meal_slot}
+    order_columns = list(order_columns or ORDER_COLUMNS)
+    item_columns = list(item_columns or ITEM_COLUMNS)
+    days = select_days(read_partitions(history_dir), **filters)
+    count(metrics, 'history_days_read', len(days))
+
+    filter_columns = [FILTER_COLUMNS[key] for key, value in filters.items() if value]
+    read_columns = list(dict.fromkeys(order_columns + filter_columns))
+    orders = read_row_groups(history_dir, days, ORDERS_FILE, 'row_group', read_columns)
+    if orders is None:
+        orders = normalize_orders(pd.DataFrame(columns=ORDER_COLUMNS))[read_columns]
+    mask = order_mask(orders, **filters)
+    orders = orders.loc[mask, order_columns].reset_index(drop=True)
+    if not with_items:
+        return orders
+
+    items = read_row_groups(history_dir, days, ITEMS_FILE, 'item_row_group', list(dict.fromkeys(item_columns + ['order_index'])))
+    if items is None:
+        return orders, normalize_items(pd.DataFrame(columns=ITEM_COLUMNS))[item_columns]
+    # Day-local order_index -> row of the day's orders in the frame read above -> row after the filter
+    day_orders = days['orders'].to_numpy()
+    read_position = items['order_index'].to_numpy() + np.repeat(np.cumsum(day_orders) - day_orders, days['items'].to_numpy())
+    kept = mask[read_position]
+    new_position = np.cumsum(mask) - 1
+    items = items[kept].assign(order_index=new_position[read_position[kept]])
+    return orders, items[item_columns].reset_index(drop=True)
@@ -0,0 +1,200 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Run as a script, order_common/ itself is on the path rather than the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from order_common.item_aggregation import DIMENSIONS, aggregate_items, explode_order_items
+from order_common.item_canonical import canonical_item_names
+from order_common.order_history import history_exists, load_order_history
+from order_common.order_store import (
+    PLATFORMS, items_with_orders, normalize_items, normalize_orders, order_store_exists, read_order_store,
+    sort_orders_by_time
+)
+from order_common.timestamps import WEEKDAYS
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Where each platform's pipeline writes its store, relative to the repo
+PLATFORM_STORES = {
+    'zomato': os.path.join(REPO_DIR, 'zomato_order_analysis', 'result', 'order_store'),
+    'swiggy': os.path.join(REPO_DIR, 'swiggy_order_analysis', 'order_store'),
+}
+# The same orders in day partitions, see order_history
+PLATFORM_HISTORIES = {
+    'zomato': os.path.join(REPO_DIR, 'zomato_order_analysis', 'result', 'order_history'),
+    'swiggy': os.path.join(REPO_DIR, 'swiggy_order_analysis', 'order_history'),
+}
+
+
+def combine_order_stores(stores):
+    # [(orders, items), ...] from every platform -> one orders table and one item table
+    orders_frames = []
+    items_frames = []
+    order_offset = 0
+    for orders, items in stores:
+        orders_frames.append(orders)
+        items_frames.append(items.assign(order_index=items['order_index'].to_numpy() + order_offset))
+        order_offset += len(orders)
+
+    # Categoricals with different categories concat to plain objects, normalizing re-encodes them
+    orders = normalize_orders(pd.concat(orders_frames, ignore_index=True))
+    items = normalize_items(pd.concat(items_frames, ignore_index=True))
+    return sort_orders_by_time(orders, items)
+
+def load_platform_stores(store_dirs=PLATFORM_STORES):
+    # Platforms whose pipeline hasn't written a store yet are skipped
+    stores = [read_order_store(store_dir) for store_dir in store_dirs.values() if order_store_exists(store_dir)]
+    if not stores:
+        raise FileNotFoundError(f'No order store found in {list(store_dirs.values())}')
+    return combine_order_stores(stores)
+
+def load_platform_histories(history_dirs=PLATFORM_HISTORIES, platform=None, start=None, end=None, weekday=None, meal_slot=None):
+    # Like load_platform_stores, but only the day partitions the filters can match are read
+    stores = [
+        load_order_history(history_dir, start, end, weekday, meal_slot)
+        for name, history_dir in history_dirs.items()
+        if (not platform or name in platform) and history_exists(history_dir)
+    ]
+    if not stores:
+        raise FileNotFoundError(f'No order history found in {list(history_dirs.values())}')
+    return combine_order_stores(stores)
+
+def build_order_index(orders, items):
+    # Orders sorted by time make a date range a binary search,
+    # items sorted by order_index make every order's items a contiguous slice
+    orders, items = sort_orders_by_time(orders, items)
+    return {
+        'orders': orders,
+        'items': items,
+        'timestamps': orders['ordered_date_time'].to_numpy(),
+        'item_order_index': items['order_index'].to_numpy(),
+    }
+
+def category_mask(values, selected):
+    # Compare integer category codes instead of strings
+    codes = values.cat.categories.get_indexer(list(selected))
+    return np.isin(values.cat.codes.to_numpy(), codes[codes >= 0])
+
+def item_name_mask(item_names, patterns):
+    # Case-insensitive substring match, evaluated once per distinct name rather than once per row
+    categories = item_names.cat.categories.to_series().astype(str).str.lower()
+    matching = np.zeros(len(categories), dtype=bool)
+    for pattern in patterns:
+        matching |= categories.str.contains(pattern.lower(), regex=False).to_numpy()
+    codes = item_names.cat.codes.to_numpy()
+    return (codes >= 0) & matching[codes]
+
+def select_orders(index, platform=None, start=None, end=None, weekday=None, meal_slot=None):
+    orders = index['orders']
+    mask = np.ones(len(orders), dtype=bool)
+
+    # start is inclusive, end is exclusive
+    if start is not None or end is not None:
+        timestamps = index['timestamps']
+        first = np.searchsorted(timestamps, np.datetime64(pd.Timestamp(start)), 'left') if start is not None else 0
+        last = np.searchsorted(timestamps, np.datetime64(pd.Timestamp(end)), 'left') if end is not None else len(orders)
+        mask[:first] = False
+        mask[last:] = False
+
+    if platform:
+        mask &= category_mask(orders['platform'], platform)
+    if weekday:
+        mask &= category_mask(orders['ordered_day'], weekday)
+    if meal_slot:
+        mask &= category_mask(orders['ordered_type'], meal_slot)
+    return mask
+
+def select_items(index, item=None, **order_filters):
+    # Items of the selected orders, optionally narrowed to matching item names
+    item_mask = select_orders(index, **order_filters)[index['item_order_index']]
+    if item:
+        item_mask &= item_name_mask(index['items']['item_name'], item)
+    return item_mask
+
+def query_orders(index, item=None, **order_filters):
+    order_mask = select_orders(index, **order_filters)
+    if item:
+        # Keep only orders that contain at least one matching item
+        item_mask = select_items(index, item, **order_filters)
+        order_mask &= np.bincount(index['item_order_index'][item_mask], minlength=len(order_mask)) > 0
+    return index['orders'][order_mask]
+
+def query_items(index, item=None, order_columns=('ordered_date_time', 'ordered_day', 'ordered_type'), **order_filters):
+    items = index['items'][select_items(index, item, **order_filters)]
+    return items_with_orders(index['orders'], items, order_columns)
+
+def query_item_demand(index, dimensions=(), item=None, **order_filters):
+    # Quantity per item for the selected orders, grouped by any report dimension
+    items = index['items'][select_items(index, item, **order_filters)]
+    item_totals = aggregate_items(explode_order_items(index['orders'], items, dimensions), dimensions)
+    return item_totals.sort_values('quantity', ascending=False).reset_index(drop=True)
+
+def split_list(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Query Zomato and Swiggy orders together')
+    parser.add_argument('--zomato-store', default=PLATFORM_STORES['zomato'], help='Order store written by the Zomato pipeline')
+    parser.add_argument('--swiggy-store', default=PLATFORM_STORES['swiggy'], help='Order store written by the Swiggy pipeline')
+    parser.add_argument('--zomato-history', default=PLATFORM_HISTORIES['zomato'], help='Order history written by the Zomato pipeline')
+    parser.add_argument('--swiggy-history', default=PLATFORM_HISTORIES['swiggy'], help='Order history written by the Swiggy pipeline')
+    parser.add_argument('--platform', type=lambda value: [part.lower() for part in split_list(value)],
+                        help=f'Comma separated platforms ({", ".join(PLATFORMS)})')
+    parser.add_argument('--start', help='First date to include, e.g. 2023-08-01')
+    parser.add_argument('--end', help='Date to stop before, e.g. 2023-09-01')
+    parser.add_argument('--weekday', type=lambda value: [part.title() for part in split_list(value)],
+                        help=f'Comma separated weekdays ({", ".join(WEEKDAYS)})')
+    parser.add_argument('--meal-slot', type=lambda value: [part.upper() for part in split_list(value)],
+                        help='Comma separated meal slots, e.g. LUNCH,DINNER')
+    parser.add_argument('--item', type=split_list, help='Comma separated item name fragments, matched case-insensitively')
+    parser.add_argument('--group-by', type=split_list, default=[],
+                        help=f'Report dimensions for the item demand ({", ".join(DIMENSIONS)})')
+    parser.add_argument('--raw-item-names', action='store_true', help='Query items under their raw platform names')
+    parser.add_argument('--orders', action='store_true', help='List the matching orders instead of item demand')
+    parser.add_argument('--limit', type=int, default=50, help='Rows to print')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    start_time = time.perf_counter()
+    history_dirs = {'zomato': args.zomato_history, 'swiggy': args.swiggy_history}
+    if (args.start or args.end or args.weekday or args.meal_slot) and any(history_exists(history_dir) for history_dir in history_dirs.values()):
+        # Date, weekday and meal slot filters are pushed down to the day partitions, the rest is filtered in memory.
+        # Without any of them every day is needed, and the single-file store reads faster
+        orders, items = load_platform_histories(history_dirs, args.platform, args.start, args.end, args.weekday, args.meal_slot)
+    else:
+        orders, items = load_platform_stores({'zomato': args.zomato_store, 'swiggy': args.swiggy_store})
+    if not args.raw_item_names:
+        # Both platforms' names for a dish resolve to the same canonical item
+        items = canonical_item_names(items)
+    index = build_order_index(orders, items)
+    load_seconds = time.perf_counter() - start_time
+
+    filters = {
+        'platform': args.platform,
+        'start': args.start,
+        'end': args.end,
+        'weekday': args.weekday,
+        'meal_slot': args.meal_slot,
+        'item': args.item,
+    }
+    start_time = time.perf_counter()
+    if args.orders:
+        result_df = query_orders(index, **filters)
+    else:
+        result_df = query_item_demand(index, args.group_by, **filters)
+    query_seconds = time.perf_counter() - start_time
+
+    with pd.option_context('display.max_rows', args.limit, 'display.max_columns', None, 'display.width', 200):
+        print(result_df.head(args.limit))
+    print(f'{len(result_df)} rows, loaded {len(index["orders"])} orders in {load_seconds * 1000:.1f} ms, '
+          f'query took {query_seconds * 1000:.1f} ms')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from order_common.timestamps import MEAL_SLOTS, WEEKDAYS, meal_slot_names
+
+MEAL_TYPES = meal_slot_names(MEAL_SLOTS)
+PLATFORMS = ['zomato', 'swiggy']
+
+# Money is kept as integer paise (cents), so sums never pick up float rounding.
+# promo is negative, as printed on the invoice. order_id is nullable, an invoice whose id
+# line could not be read is still stored rather than failing the whole batch
+ORDER_COLUMNS = ['platform', 'order_id', 'ordered_date_time', 'ordered_day', 'ordered_type', 'total_amount_cents', 'promo_cents']
+# order_index is the row of the parent order in the orders table, so
+# attaching order dimensions to items is a positional take instead of a join
+# item_name is dictionary encoded, so each distinct name is stored once and rows carry an integer code
+ITEM_COLUMNS = ['platform', 'order_index', 'order_id', 'item_name', 'quantity', 'unit_price_cents']
+
+ORDERS_FILE = 'orders.parquet'
+ITEMS_FILE = 'order_items.parquet'
+
+
+def parse_amount_cents(values):
+    # '₹112.80' / '-₹75.20' / 213 / 79.99 -> 11280 / -7520 / 21300 / 7999, unreadable amounts become <NA>
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        amounts = values.astype('float64')
+    else:
+        cleaned = values.astype('string').str.replace(r'[₹,\s]', '', regex=True)
+        amounts = pd.to_numeric(cleaned, errors='coerce').astype('float64')
+    return amounts.mul(100).round().astype('Int64')
+
+def cents_to_rupees(cents):
+    return pd.Series(cents).astype('float64') / 100
+
+def normalize_orders(orders_df):
+    orders = pd.DataFrame({
+        'platform': pd.Categorical(orders_df['platform'], categories=PLATFORMS),
+        'order_id': orders_df['order_id'].astype('Int64'),
+        'ordered_date_time': pd.to_datetime(orders_df['ordered_date_time']),
+        'ordered_day': pd.Categorical(orders_df['ordered_day'], categories=WEEKDAYS),
+        'ordered_type': pd.Categorical(orders_df['ordered_type'], categories=meal_type_categories(orders_df['ordered_type'])),
+        'total_amount_cents': orders_df['total_amount_cents'].astype('Int64'),
+        'promo_cents': orders_df['promo_cents'].fillna(0).astype('int64'),
+    })
+    return orders
+
+def normalize_items(items_df):
+    return pd.DataFrame({
+        'platform': pd.Categorical(items_df['platform'], categories=PLATFORMS),
+        'order_index': items_df['order_index'].astype('int64'),
+        'order_id': items_df['order_id'].astype('Int64'),
+        'item_name': items_df['item_name'].astype('category'),
+        'quantity': items_df['quantity'].astype('int32'),
+        'unit_price_cents': items_df['unit_price_cents'].astype('Int64'),
+    }).reset_index(drop=True)
+
+def meal_type_categories(meal_types):
+    # Default slots first, then any custom slot names configured for this run
+    custom_types = set(pd.Series(meal_types).dropna().astype(str)) - set(MEAL_TYPES)
+    return MEAL_TYPES + sorted(custom_types)
+
+def order_store_exists(store_dir):
+    return os.path.exists(os.path.join(store_dir, ORDERS_FILE)) and os.path.exists(os.path.join(store_dir, ITEMS_FILE))
+
+def sort_orders_by_time(orders, items):
+    # Order rows by time and repoint the items at their parent's new row
+    order_position = np.argsort(orders['ordered_date_time'].to_numpy(), kind='stable')
+    new_position = np.empty_like(order_position)
+    new_position[order_position] = np.arange(len(order_position))
+    orders = orders.take(order_position).reset_index(drop=True)
+    items = items.assign(order_index=new_position[items['order_index'].to_numpy()])
+    items = items.sort_values('order_index', kind='stable').reset_index(drop=True)
+    return orders, items
+
+def save_order_store(store_dir, orders, items):
+    # Create the store folder if it doesn't exist
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    orders.to_parquet(os.path.join(store_dir, ORDERS_FILE), index=False)
+    items.to_parquet(os.path.join(store_dir, ITEMS_FILE), index=False)
+
+def write_order_store(store_dir, orders_df, items_df):
+    orders, items = sort_orders_by_time(normalize_orders(orders_df.reset_index(drop=True)), normalize_items(items_df))
+    save_order_store(store_dir, orders, items)
+    return orders, items
+
+def read_orders(store_dir, columns=None):
+    # Parquet files are memory-mapped, only the requested columns are decoded
+    return pd.read_parquet(os.path.join(store_dir, ORDERS_FILE), columns=columns, memory_map=True)
+
+def read_items(store_dir, columns=None):
+    return pd.read_parquet(os.path.join(store_dir, ITEMS_FILE), columns=columns, memory_map=True)
+
+def read_order_store(store_dir, order_columns=None, item_columns=None):
+    return read_orders(store_dir, order_columns), read_items(store_dir, item_columns)
+
+def items_with_orders(orders, items, order_columns=('ordered_day', 'ordered_type')):
+    # Attach order level dimensions to the item child table
+    order_dims = orders[list(order_columns)].take(items['order_index'].to_numpy()).reset_index(drop=True)
+    return pd.concat([items.reset_index(drop=True), order_dims], axis=1)
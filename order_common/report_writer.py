@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+REPORT_FORMATS = ['xlsx', 'csv', 'parquet']
+
+# Excel sheet names are limited to 31 characters and can't contain []:*?/\
+INVALID_SHEET_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+
+
+def sheet_name(name):
+    return INVALID_SHEET_CHARACTERS.sub('_', str(name))[:31]
+
+def sheet_names(names):
+    # Names cut to 31 characters can collide, later ones get a ~1, ~2 suffix within the limit.
+    # Excel compares sheet names ignoring case
+    used = set()
+    unique_names = []
+    for name in names:
+        unique_name = sheet_name(name)
+        suffix = 0
+        while unique_name.lower() in used:
+            suffix += 1
+            unique_name = sheet_name(name)[:31 - len(f'~{suffix}')] + f'~{suffix}'
+        used.add(unique_name.lower())
+        unique_names.append(unique_name)
+    return unique_names
+
+def report_path(path, report_format):
+    # 'result/item_counts.xlsx' -> 'result/item_counts.xlsx' / 'result/item_counts/' for csv and parquet
+    base_path = os.path.splitext(path)[0]
+    return base_path + '.xlsx' if report_format == 'xlsx' else base_path
+
+def hashable_frame(df):
+    # Lists and dicts in object columns can't be hashed directly, their text form can
+    object_columns = [col for col in df.columns if df[col].dtype == object]
+    return df.astype({col: str for col in object_columns}) if object_columns else df
+
+def data_fingerprint(sheets):
+    digest = hashlib.sha256()
+    for name, df in sheets.items():
+        digest.update(str(name).encode())
+        digest.update(json.dumps([str(col) for col in df.columns]).encode())
+        digest.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode())
+        digest.update(pd.util.hash_pandas_object(hashable_frame(df), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def fingerprint_path(path):
+    return path.rstrip('/\\') + '.fingerprint'
+
+def is_unchanged(path, fingerprint):
+    if not os.path.exists(path) or not os.path.exists(fingerprint_path(path)):
+        return False
+    with open(fingerprint_path(path)) as f:
+        return f.read().strip() == fingerprint
+
+def cell_writer(worksheet, series, date_format):
+    # Pick one write call per column up front instead of dispatching on every cell
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = [None if pd.isna(value) else value.to_pydatetime() for value in series]
+        return values, lambda row, col, value: worksheet.write_datetime(row, col, value, date_format)
+    if pd.api.types.is_bool_dtype(series):
+        return series.tolist(), worksheet.write_boolean
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.astype('float64').to_numpy()
+        return [None if np.isnan(value) else value for value in values], worksheet.write_number
+    values = [None if value is None or (isinstance(value, float) and np.isnan(value)) else str(value) for value in series.astype(object)]
+    return values, worksheet.write_string
+
+def write_xlsx(sheets, path):
+    import xlsxwriter
+
+    # constant_memory flushes every finished row to disk, so rows must be written strictly in order
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    try:
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        for name, df in zip(sheet_names(sheets), sheets.values()):
+            worksheet = workbook.add_worksheet(name)
+            worksheet.write_row(0, 0, [str(col) for col in df.columns])
+
+            columns = [cell_writer(worksheet, df[col], date_format) for col in df.columns]
+            for row_index in range(len(df)):
+                for col_index, (values, write) in enumerate(columns):
+                    value = values[row_index]
+                    if value is not None:
+                        write(row_index + 1, col_index, value)
+    finally:
+        workbook.close()
+
+def write_table_files(sheets, path, report_format):
+    # One file per sheet inside a report folder
+    if not os.path.exists(path):
+        os.makedirs(path)
+    for name, df in zip(sheet_names(sheets), sheets.values()):
+        file_path = os.path.join(path, f'{name}.{report_format}')
+        if report_format == 'csv':
+            df.to_csv(file_path, index=False)
+        else:
+            hashable_frame(df).to_parquet(file_path, index=False)
+
+def write_report(sheets, path, report_format='xlsx', skip_unchanged=True):
+    # Write {sheet name: DataFrame} as one workbook (or one folder of CSV/Parquet files),
+    # returns False when the data matches the last write and nothing was rewritten
+    if report_format not in REPORT_FORMATS:
+        raise ValueError(f'Unknown report format {report_format}, expected one of {REPORT_FORMATS}')
+    path = report_path(path, report_format)
+
+    # Create the output folder if it doesn't exist
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    fingerprint = data_fingerprint(sheets)
+    if skip_unchanged and is_unchanged(path, fingerprint):
+        return False
+
+    if report_format == 'xlsx':
+        write_xlsx(sheets, path)
+    else:
+        write_table_files(sheets, path, report_format)
+    with open(fingerprint_path(path), 'w') as f:
+        f.write(fingerprint)
+    return True
@@ -0,0 +1,133 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Run as a script, order_common/ itself is on the path rather than the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from order_common.calendar_exposure import with_occurrence_averages
+from order_common.item_aggregation import DIMENSIONS, dimension_columns, explode_order_items
+from order_common.item_canonical import canonical_item_names
+from order_common.order_query import PLATFORM_STORES, load_platform_stores, split_list
+from order_common.order_store import cents_to_rupees
+
+# Every sum is exact paise, only the exports show rupees
+ORDER_MEASURES = ['orders', 'billed_orders', 'total_cents', 'discount_cents']
+
+
+def order_money(orders):
+    # Order level arrays: bill total (0 where unreadable), whether it was readable, and the discount as a positive amount
+    total_amount = orders['total_amount_cents']
+    return (
+        total_amount.fillna(0).to_numpy(dtype='int64'),
+        total_amount.notna().to_numpy(),
+        -orders['promo_cents'].to_numpy(dtype='int64'),
+    )
+
+def item_money(orders, items, dimensions=('day', 'meal_type')):
+    # One row per ordered item with its line value and its share of the order's discount.
+    # The discount is split over the order's items by line value, so an item's share follows what it cost
+    long_items = explode_order_items(orders, items, dimensions)
+    order_index = long_items['order_index'].to_numpy()
+    gross = long_items['quantity'].to_numpy(dtype='int64') * long_items['unit_price_cents'].fillna(0).to_numpy(dtype='int64')
+
+    order_gross = np.bincount(order_index, weights=gross, minlength=len(orders))[order_index]
+    _, _, order_discount = order_money(orders)
+    share = np.divide(gross, order_gross, out=np.zeros(len(gross)), where=order_gross > 0)
+    long_items['gross_cents'] = gross
+    long_items['discount_cents'] = order_discount[order_index] * share
+    return long_items
+
+def item_revenue(orders, items, dimensions=('day', 'meal_type')):
+    # Quantity, orders, gross and net revenue and discount share per item, for any report dimensions
+    group_columns = dimension_columns(dimensions) + ['item_name']
+    long_items = item_money(orders, items, dimensions)
+    item_totals = long_items.groupby(group_columns, observed=True, sort=False).agg(
+        quantity=('quantity', 'sum'),
+        orders=('order_index', 'nunique'),
+        gross_cents=('gross_cents', 'sum'),
+        discount_cents=('discount_cents', 'sum'),
+    ).reset_index()
+    item_totals['discount_cents'] = item_totals['discount_cents'].round().astype('int64')
+    return with_item_ratios(item_totals)
+
+def with_item_ratios(item_totals):
+    gross = item_totals['gross_cents'].to_numpy(dtype='float64')
+    item_totals['net_cents'] = item_totals['gross_cents'] - item_totals['discount_cents']
+    item_totals['discount_share'] = np.divide(item_totals['discount_cents'], gross, out=np.zeros(len(gross)), where=gross > 0).round(4)
+    return item_totals
+
+def order_value(orders, dimensions=('day', 'meal_type')):
+    # Orders, billed total, discount and average order value per group of orders
+    group_columns = dimension_columns(dimensions)
+    total, billed, discount = order_money(orders)
+    # A stand-in item per order lets explode_order_items attach the same dimensions as the item report
+    long_orders = explode_order_items(orders, pd.DataFrame({'order_index': np.arange(len(orders))}), dimensions)
+    long_orders['orders'] = 1
+    long_orders['billed_orders'] = billed.astype('int64')
+    long_orders['total_cents'] = total
+    long_orders['discount_cents'] = discount
+
+    if group_columns:
+        order_totals = long_orders.groupby(group_columns, observed=True, sort=False)[ORDER_MEASURES].sum().reset_index()
+    else:
+        order_totals = long_orders[ORDER_MEASURES].sum().to_frame().T
+    billed_orders = order_totals['billed_orders'].to_numpy(dtype='float64')
+    order_totals['aov_cents'] = np.divide(order_totals['total_cents'], billed_orders, out=np.zeros(len(billed_orders)), where=billed_orders > 0).round()
+    order_totals['discount_share'] = np.divide(
+        order_totals['discount_cents'], order_totals['total_cents'] + order_totals['discount_cents'],
+        out=np.zeros(len(order_totals)), where=(order_totals['total_cents'] + order_totals['discount_cents']).to_numpy() > 0
+    ).round(4)
+    return order_totals
+
+def in_rupees(df):
+    # Report copy with every *_cents column as rupees
+    df = df.copy()
+    cents_columns = [col for col in df.columns if col.endswith('_cents')]
+    for col in cents_columns:
+        df[col] = cents_to_rupees(df[col]).to_numpy()
+    return df.rename(columns={col: col[:-len('_cents')] for col in cents_columns})
+
+def revenue_sheets(orders, items, dimensions=('day', 'meal_type'), exposure=None):
+    # Weekday/meal rows also get their quantity or orders per open occurrence
+    item_totals = item_revenue(orders, items, dimensions).sort_values('net_cents', ascending=False)
+    item_totals = with_occurrence_averages(item_totals, exposure)
+    order_totals = with_occurrence_averages(order_value(orders, dimensions), exposure, 'orders')
+    return {
+        'item_revenue': in_rupees(item_totals.astype({col: str for col in item_totals.columns if item_totals[col].dtype == 'category'})),
+        'order_value': in_rupees(order_totals),
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Revenue, discount share and average order value across both platforms')
+    parser.add_argument('--zomato-store', default=PLATFORM_STORES['zomato'], help='Order store written by the Zomato pipeline')
+    parser.add_argument('--swiggy-store', default=PLATFORM_STORES['swiggy'], help='Order store written by the Swiggy pipeline')
+    parser.add_argument('--group-by', type=split_list, default=['platform', 'day', 'meal_type'],
+                        help=f'Report dimensions ({", ".join(dim for dim in DIMENSIONS if dim != "order")})')
+    parser.add_argument('--raw-item-names', action='store_true', help='Report items under their raw platform names')
+    parser.add_argument('--orders', action='store_true', help='Print order value per group instead of item revenue')
+    parser.add_argument('--limit', type=int, default=50, help='Rows to print')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    orders, items = load_platform_stores({'zomato': args.zomato_store, 'swiggy': args.swiggy_store})
+    if not args.raw_item_names:
+        items = canonical_item_names(items)
+
+    start_time = time.perf_counter()
+    if args.orders:
+        result_df = order_value(orders, args.group_by)
+    else:
+        result_df = item_revenue(orders, items, args.group_by).sort_values('net_cents', ascending=False).reset_index(drop=True)
+    seconds = time.perf_counter() - start_time
+
+    with pd.option_context('display.max_rows', args.limit, 'display.max_columns', None, 'display.width', 200):
+        print(in_rupees(result_df).head(args.limit))
+    print(f'{len(result_df)} rows from {len(orders)} orders in {seconds * 1000:.1f} ms')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Run as a script, order_common/ itself is on the path rather than the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from order_common.calendar_exposure import check_closure_args, exposure_for, parse_closures, with_occurrence_averages
+from order_common.instrumentation import count
+from order_common.item_aggregation import DIMENSIONS, dimension_columns, explode_order_items
+from order_common.order_query import PLATFORM_STORES, category_mask, item_name_mask, split_list
+from order_common.order_store import PLATFORMS, cents_to_rupees
+from order_common.timestamps import MEAL_SLOTS, WEEKDAYS, UNKNOWN_MEAL_SLOT, build_hour_lookup, meal_slot_names, parse_meal_slots
+
+# Finest grain every report rolls up from: one row per date, hour, platform and item.
+# Meal slot and week are derived from date and hour at query time, so changing the meal
+# slot hours never needs a rebuild. The weekday is kept as the pipeline assigned it, orders
+# without a readable time have no date and hour but may still carry a weekday
+CUBE_COLUMNS = ['ordered_date', 'ordered_day', 'ordered_hour', 'platform', 'item_name', 'quantity', 'revenue_cents']
+CUBE_KEYS = ['ordered_date', 'ordered_day', 'ordered_hour', 'platform', 'item_name']
+UNKNOWN_HOUR = -1
+MEASURES = ['quantity', 'revenue_cents']
+
+# Order and item columns whose change on a day makes that day's cube rows stale
+FINGERPRINT_ORDER_COLUMNS = ['platform', 'order_id', 'ordered_date_time', 'ordered_day']
+FINGERPRINT_ITEM_COLUMNS = ['item_name', 'quantity', 'unit_price_cents']
+
+CUBE_FILE = 'cube.parquet'
+DAYS_FILE = 'cube_days.parquet'
+
+# About a month of a busy outlet per row group, so a date range skips the rest of the file
+ROW_GROUP_SIZE = 50000
+
+
+def cube_items(orders, items):
+    # One row per ordered item with its date, weekday and hour
+    long_items = explode_order_items(orders, items, ['date', 'day', 'hour'])
+    long_items['ordered_hour'] = long_items['ordered_hour'].fillna(UNKNOWN_HOUR).astype('int8')
+    long_items['revenue_cents'] = long_items['quantity'].astype('int64') * long_items['unit_price_cents'].fillna(0).astype('int64')
+    return long_items
+
+def day_fingerprints(orders, items):
+    # Sum of the row hashes per date, wrapping in uint64, so any added, removed or edited order or item
+    # changes its day. Worked out on the orders and items as stored, before anything is exploded.
+    # Items are hashed with their order's hash rather than its position, so orders added on another day
+    # leave this day's fingerprint alone. Orders without a date share one NaT day
+    order_dates = orders['ordered_date_time'].dt.normalize()
+    date_codes, dates = pd.factorize(order_dates, sort=True, use_na_sentinel=False)
+    order_hashes = pd.util.hash_pandas_object(orders[FINGERPRINT_ORDER_COLUMNS], index=False).to_numpy()
+    order_index = items['order_index'].to_numpy()
+    item_hashes = pd.util.hash_pandas_object(
+        items[FINGERPRINT_ITEM_COLUMNS].assign(order_hash=order_hashes[order_index]), index=False
+    ).to_numpy()
+    fingerprints = np.zeros(len(dates), dtype='uint64')
+    np.add.at(fingerprints, date_codes, order_hashes)
+    np.add.at(fingerprints, date_codes[order_index], item_hashes)
+    return pd.DataFrame({'ordered_date': dates, 'fingerprint': fingerprints}), order_dates
+
+def orders_on(orders, items, order_mask):
+    # The selected orders with their items, order_index pointing at the order's new row
+    new_position = np.cumsum(order_mask) - 1
+    item_mask = order_mask[items['order_index'].to_numpy()]
+    kept_items = items[item_mask]
+    kept_items = kept_items.assign(order_index=new_position[kept_items['order_index'].to_numpy()])
+    return orders[order_mask].reset_index(drop=True), kept_items.reset_index(drop=True)
+
+def normalize_cube(cube):
+    return pd.DataFrame({
+        'ordered_date': pd.to_datetime(cube['ordered_date']),
+        'ordered_day': pd.Categorical(cube['ordered_day'], categories=WEEKDAYS),
+        'ordered_hour': cube['ordered_hour'].astype('int8'),
+        'platform': pd.Categorical(cube['platform'], categories=PLATFORMS),
+        'item_name': cube['item_name'].astype(str).astype('category'),
+        'quantity': cube['quantity'].astype('int32'),
+        'revenue_cents': cube['revenue_cents'].astype('int64'),
+    }).sort_values(CUBE_KEYS, kind='stable').reset_index(drop=True)
+
+def build_cube(long_items):
+    cube = long_items.groupby(CUBE_KEYS, observed=True, sort=False, dropna=False)[MEASURES].sum().reset_index()
+    return normalize_cube(cube)
+
+def cube_exists(cube_dir):
+    return os.path.exists(os.path.join(cube_dir, CUBE_FILE)) and os.path.exists(os.path.join(cube_dir, DAYS_FILE))
+
+def save_cube(cube_dir, cube, fingerprints):
+    if not os.path.exists(cube_dir):
+        os.makedirs(cube_dir)
+    # Written next to the old files and swapped in, a reader never sees a half written cube
+    for df, filename in [(cube, CUBE_FILE), (fingerprints, DAYS_FILE)]:
+        temp_path = os.path.join(cube_dir, filename + '.tmp')
+        df.to_parquet(temp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+        os.replace(temp_path, os.path.join(cube_dir, filename))
+
+def load_cube(cube_dir, start=None, end=None, columns=None):
+    # start is inclusive and end exclusive, row groups outside the range are never decoded.
+    # A date range leaves out the orders without a date
+    filters = []
+    if start is not None:
+        filters.append(('ordered_date', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('ordered_date', '<', pd.Timestamp(end)))
+    return pd.read_parquet(os.path.join(cube_dir, CUBE_FILE), columns=columns, filters=filters or None)
+
+def update_cube(cube_dir, orders, items, rebuild=False, metrics=None):
+    # The changed days are found from the stored orders and items, and only their items are exploded
+    # and aggregated again
+    fingerprints, order_dates = day_fingerprints(orders, items)
+
+    if rebuild or not cube_exists(cube_dir):
+        changed_dates = fingerprints['ordered_date']
+        kept_cube = None
+    else:
+        previous = pd.read_parquet(os.path.join(cube_dir, DAYS_FILE))
+        compared = fingerprints.merge(previous, on='ordered_date', how='left', suffixes=('', '_previous'))
+        changed_dates = compared.loc[compared['fingerprint'] != compared['fingerprint_previous'], 'ordered_date']
+        removed_dates = previous.loc[~previous['ordered_date'].isin(fingerprints['ordered_date']), 'ordered_date']
+        if changed_dates.empty and removed_dates.empty:
+            return load_cube(cube_dir)
+        kept_cube = load_cube(cube_dir)
+        kept_cube = kept_cube[kept_cube['ordered_date'].isin(fingerprints['ordered_date']) & ~kept_cube['ordered_date'].isin(changed_dates)]
+
+    if kept_cube is None:
+        long_items = cube_items(orders, items)
+    else:
+        long_items = cube_items(*orders_on(orders, items, order_dates.isin(changed_dates).to_numpy()))
+    changed_cube = build_cube(long_items)
+    cube = changed_cube if kept_cube is None else normalize_cube(pd.concat([kept_cube, changed_cube], ignore_index=True))
+    save_cube(cube_dir, cube, fingerprints)
+    count(metrics, 'cube_days_rebuilt', len(changed_dates))
+    return cube
+
+def with_calendar_columns(cube, columns, meal_slots=MEAL_SLOTS):
+    # Derive the coarser calendar columns a roll-up or filter needs from date and hour
+    cube = cube.copy()
+    if 'ordered_type' in columns:
+        hours = cube['ordered_hour'].to_numpy()
+        labels = np.where(hours == UNKNOWN_HOUR, UNKNOWN_MEAL_SLOT, build_hour_lookup(meal_slots)[hours])
+        cube['ordered_type'] = pd.Categorical(labels, categories=meal_slot_names(meal_slots))
+    if 'ordered_week' in columns:
+        # Weeks are labelled by their Monday
+        cube['ordered_week'] = cube['ordered_date'] - pd.to_timedelta(cube['ordered_date'].dt.weekday, unit='D')
+    return cube
+
+def cube_rollup(cube, dimensions=(), meal_slots=MEAL_SLOTS, platform=None, weekday=None, meal_slot=None,
+                hours=None, item=None):
+    # Quantity and revenue per item for any report dimensions, a groupby over the cube instead of the orders
+    group_columns = dimension_columns(dimensions)
+    cube = with_calendar_columns(cube, group_columns + (['ordered_type'] if meal_slot else []), meal_slots)
+
+    mask = np.ones(len(cube), dtype=bool)
+    if platform:
+        mask &= category_mask(cube['platform'], platform)
+    if weekday:
+        mask &= category_mask(cube['ordered_day'], weekday)
+    if meal_slot:
+        mask &= category_mask(cube['ordered_type'], meal_slot)
+    if hours:
+        # (first hour, end hour) with the end hour exclusive, e.g. (19, 22) for 7-10 PM
+        mask &= (cube['ordered_hour'] >= hours[0]).to_numpy() & (cube['ordered_hour'] < hours[1]).to_numpy()
+    if item:
+        mask &= item_name_mask(cube['item_name'], item)
+
+    return (
+        cube[mask].groupby(group_columns + ['item_name'], observed=True, sort=False)[MEASURES].sum()
+        .reset_index()
+    )
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Item demand from the rollup cubes of both platforms')
+    parser.add_argument('--zomato-cube', default=os.path.join(os.path.dirname(PLATFORM_STORES['zomato']), 'rollup_cube'),
+                        help='Rollup cube written by the Zomato pipeline')
+    parser.add_argument('--swiggy-cube', default=os.path.join(os.path.dirname(PLATFORM_STORES['swiggy']), 'rollup_cube'),
+                        help='Rollup cube written by the Swiggy pipeline')
+    parser.add_argument('--platform', type=lambda value: [part.lower() for part in split_list(value)],
+                        help=f'Comma separated platforms ({", ".join(PLATFORMS)})')
+    parser.add_argument('--start', help='First date to include, e.g. 2023-08-01')
+    parser.add_argument('--end', help='Date to stop before, e.g. 2023-09-01')
+    parser.add_argument('--weekday', type=lambda value: [part.title() for part in split_list(value)],
+                        help=f'Comma separated weekdays ({", ".join(WEEKDAYS)})')
+    parser.add_argument('--meal-slot', type=lambda value: [part.upper() for part in split_list(value)],
+                        help='Comma separated meal slots, e.g. LUNCH,DINNER')
+    parser.add_argument('--hours', type=lambda value: tuple(int(hour) for hour in value.split('-')),
+                        help='Time window as first-end hour, e.g. 19-22')
+    parser.add_argument('--item', type=split_list, help='Comma separated item name fragments, matched case-insensitively')
+    parser.add_argument('--group-by', type=split_list, default=[],
+                        help=f'Report dimensions ({", ".join(dim for dim in DIMENSIONS if dim != "order")})')
+    parser.add_argument('--meal-slots', type=parse_meal_slots, default=MEAL_SLOTS,
+                        help='Meal slot hours, e.g. BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24')
+    parser.add_argument('--closed', type=parse_closures,
+                        help='Days the outlet was closed, left out of the per-day averages, e.g. Monday,Sunday:BREAKFAST,2023-08-15')
+    parser.add_argument('--limit', type=int, default=50, help='Rows to print')
+    return check_closure_args(parser, parser.parse_args())
+
+def main():
+    args = parse_args()
+
+    start_time = time.perf_counter()
+    # Cube rows are additive, so the platforms' cubes simply stack
+    cubes = [load_cube(cube_dir, args.start, args.end) for cube_dir in [args.zomato_cube, args.swiggy_cube] if cube_exists(cube_dir)]
+    if not cubes:
+        raise FileNotFoundError(f'No rollup cube found in {[args.zomato_cube, args.swiggy_cube]}')
+    cube = normalize_cube(pd.concat(cubes, ignore_index=True))
+    load_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    result_df = cube_rollup(cube, args.group_by, args.meal_slots, args.platform, args.weekday, args.meal_slot, args.hours, args.item)
+    result_df = result_df.sort_values('quantity', ascending=False).reset_index(drop=True)
+    # Grouped by weekday (and meal slot), also show the quantity per open occurrence over the queried range
+    exposure = exposure_for(cube['ordered_date'], args.meal_slots, args.closed, args.start,
+                            pd.Timestamp(args.end) - pd.Timedelta(days=1) if args.end else None)
+    result_df = with_occurrence_averages(result_df, exposure)
+    query_seconds = time.perf_counter() - start_time
+
+    result_df['revenue'] = cents_to_rupees(result_df.pop('revenue_cents')).to_numpy()
+    with pd.option_context('display.max_rows', args.limit, 'display.max_columns', None, 'display.width', 200):
+        print(result_df.head(args.limit))
+    print(f'{len(result_df)} rows, loaded {len(cube)} cube rows in {load_seconds * 1000:.1f} ms, '
+          f'query took {query_seconds * 1000:.1f} ms')
+
+if __name__ == "__main__":
+    main()
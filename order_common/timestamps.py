@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# (meal slot, first hour, end hour) with the end hour exclusive, hours outside every slot are UNKNOWN
+MEAL_SLOTS = [('BREAKFAST', 6, 10), ('LUNCH', 10, 17), ('DINNER', 18, 24)]
+UNKNOWN_MEAL_SLOT = 'UNKNOWN'
+
+ZOMATO_TIMESTAMP_FORMAT = '%d %b %Y at %I:%M %p'
+SWIGGY_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Only strip 'st'/'nd'/'rd'/'th' when it directly follows the day number, e.g. '25th Aug' -> '25 Aug'
+ORDINAL_SUFFIX_PATTERN = r'\b(\d{1,2})(?:st|nd|rd|th)\b'
+
+
+def parse_meal_slots(spec):
+    # 'BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24' -> [('BREAKFAST', 6, 10), ...]
+    meal_slots = []
+    for slot in spec.split(','):
+        name, hours = slot.split('=')
+        start_hour, end_hour = hours.split('-')
+        meal_slots.append((name.strip().upper(), int(start_hour), int(end_hour)))
+    return meal_slots
+
+def build_hour_lookup(meal_slots=MEAL_SLOTS):
+    # One label per hour of the day, so bucketing a column is a single array take
+    hour_lookup = np.full(24, UNKNOWN_MEAL_SLOT, dtype=object)
+    for name, start_hour, end_hour in meal_slots:
+        if not 0 <= start_hour < end_hour <= 24:
+            raise ValueError(f'Invalid hours for meal slot {name}: {start_hour}-{end_hour}')
+        if (hour_lookup[start_hour:end_hour] != UNKNOWN_MEAL_SLOT).any():
+            raise ValueError(f'Meal slot {name} overlaps another slot')
+        hour_lookup[start_hour:end_hour] = name
+    return hour_lookup
+
+def meal_slot_names(meal_slots=MEAL_SLOTS):
+    return [name for name, _, _ in meal_slots] + [UNKNOWN_MEAL_SLOT]
+
+def strip_ordinal_suffixes(values):
+    return values.astype('string').str.replace(ORDINAL_SUFFIX_PATTERN, r'\1', regex=True)
+
+def parse_timestamps(values, timestamp_format=None):
+    # Whole column at once, unparseable values become NaT instead of raising
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values.astype('string'), format=timestamp_format, errors='coerce')
+
+def parse_zomato_timestamps(values):
+    return parse_timestamps(strip_ordinal_suffixes(values), ZOMATO_TIMESTAMP_FORMAT)
+
+def parse_swiggy_timestamps(values):
+    # The XLSX export already holds datetimes, the CSV export holds strings
+    if values.dtype == object:
+        values = values.astype('string')
+    return parse_timestamps(values, SWIGGY_TIMESTAMP_FORMAT)
+
+def weekday_names(timestamps):
+    weekday = timestamps.dt.weekday.to_numpy(dtype='float64', na_value=np.nan)
+    codes = np.where(np.isnan(weekday), -1, weekday).astype('int8')
+    return pd.Categorical.from_codes(codes, categories=WEEKDAYS)
+
+def meal_slots_for(timestamps, meal_slots=MEAL_SLOTS):
+    hour_lookup = build_hour_lookup(meal_slots)
+    hours = timestamps.dt.hour.to_numpy(dtype='float64', na_value=np.nan)
+    labels = np.where(np.isnan(hours), UNKNOWN_MEAL_SLOT, hour_lookup[np.nan_to_num(hours).astype('int8')])
+    return pd.Categorical(labels, categories=meal_slot_names(meal_slots))
+
+def add_calendar_columns(df, timestamp_column='ordered_date_time', meal_slots=MEAL_SLOTS):
+    timestamps = df[timestamp_column]
+    df['ordered_day'] = weekday_names(timestamps)
+    df['ordered_type'] = meal_slots_for(timestamps, meal_slots)
+    return df
@@ -0,0 +1,251 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+OUTLETS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(OUTLETS_DIR, '..')
+# The pipelines import their own modules by name, as they do when run from their folder
+sys.path.extend([REPO_DIR, os.path.join(REPO_DIR, 'zomato_order_analysis'), os.path.join(REPO_DIR, 'swiggy_order_analysis')])
+
+import swiggy_analysis
+import zomato_order_store
+import zomato_predective_analysis
+from order_common.instrumentation import close_run_log, log_event, merge_metrics, new_metrics, open_run_log, print_run_summary
+from order_common.order_store import cents_to_rupees, order_store_exists, read_orders
+from order_common.report_writer import REPORT_FORMATS, write_report
+from order_common.revenue import in_rupees, order_value
+from order_common.rollup_cube import cube_exists, cube_rollup, load_cube, normalize_cube
+
+ZOMATO_INPUT_DIR = 'zomato_orders'
+SWIGGY_EXTENSIONS = ('.csv', '.xlsx')
+COMBINED_DIR = 'combined'
+
+# Where each pipeline leaves its order store and cube, relative to the folder it ran in
+PLATFORM_OUTPUTS = {
+    'zomato': (zomato_order_store.ORDER_STORE_DIR, zomato_order_store.ROLLUP_CUBE_DIR),
+    'swiggy': (swiggy_analysis.ORDER_STORE_DIR, swiggy_analysis.ROLLUP_CUBE_DIR),
+}
+
+
+def list_swiggy_exports(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(SWIGGY_EXTENSIONS) and not name.startswith('~$')
+    )
+
+def new_outlet(name, folder=None):
+    return {'outlet': name, 'folder': folder, 'zomato': [], 'swiggy': [],
+            'restaurant_id': None, 'restaurant_name': None, 'restaurant_address': None}
+
+def add_swiggy_export(outlet, path, metadata):
+    outlet['swiggy'].append(path)
+    for key in ['restaurant_id', 'restaurant_name', 'restaurant_address']:
+        outlet[key] = outlet[key] or metadata[key]
+
+def discover_outlets(root):
+    # <root>/<outlet>/zomato_orders/*.pdf and <root>/<outlet>/*.csv|*.xlsx, one outlet per folder.
+    # Exports left loose in the root go to the outlet with the same Swiggy Restaurant Id, or become their own outlet
+    outlets = {}
+    by_restaurant_id = {}
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if not os.path.isdir(folder) or name == COMBINED_DIR:
+            continue
+        outlet = new_outlet(name, folder)
+        zomato_dir = os.path.join(folder, ZOMATO_INPUT_DIR)
+        if os.path.isdir(zomato_dir) and zomato_predective_analysis.list_pdf_files(zomato_dir):
+            outlet['zomato'] = [zomato_dir]
+        for path in list_swiggy_exports(folder):
+            add_swiggy_export(outlet, path, swiggy_analysis.read_export_metadata(path))
+        if outlet['zomato'] or outlet['swiggy']:
+            outlets[name] = outlet
+            if outlet['restaurant_id']:
+                by_restaurant_id[outlet['restaurant_id']] = outlet
+
+    for path in list_swiggy_exports(root):
+        metadata = swiggy_analysis.read_export_metadata(path)
+        restaurant_id = metadata['restaurant_id'] or os.path.splitext(os.path.basename(path))[0]
+        if restaurant_id not in by_restaurant_id:
+            by_restaurant_id[restaurant_id] = outlets.setdefault(f'swiggy_{restaurant_id}', new_outlet(f'swiggy_{restaurant_id}'))
+        add_swiggy_export(by_restaurant_id[restaurant_id], path, metadata)
+    return list(outlets.values())
+
+def input_bytes(paths):
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(os.path.getsize(pdf) for pdf in zomato_predective_analysis.list_pdf_files(path))
+        else:
+            total += os.path.getsize(path)
+    return total
+
+def outlet_jobs(outlets, output_dir):
+    # One job per outlet and platform, largest input first so the long jobs do not start last
+    jobs = []
+    for outlet in outlets:
+        for platform in ['zomato', 'swiggy']:
+            if outlet[platform]:
+                jobs.append({
+                    'outlet': outlet['outlet'],
+                    'platform': platform,
+                    'inputs': [os.path.abspath(path) for path in outlet[platform]],
+                    'output_dir': os.path.abspath(os.path.join(output_dir, outlet['outlet'], platform)),
+                    'input_bytes': input_bytes(outlet[platform]),
+                })
+    return sorted(jobs, key=lambda job: job['input_bytes'], reverse=True)
+
+def pipeline_argv(args):
+    # Options both pipelines share, passed through as they were given
+    argv = ['--report-format', args.report_format]
+    if args.meal_slots:
+        argv += ['--meal-slots', args.meal_slots]
+    if args.closed:
+        argv += ['--closed', args.closed]
+    if args.raw_item_names:
+        argv.append('--raw-item-names')
+    return argv
+
+def run_outlet_job(job, shared_argv, forecast_days):
+    # Worker entry point: each job runs in its own output folder, so the relative paths
+    # every pipeline writes to (result/, order_store/, rollup_cube/, caches) never collide
+    os.makedirs(job['output_dir'], exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(job['output_dir'])
+    metrics = new_metrics()
+    log = open_run_log('run_log.jsonl')
+    start_time = time.perf_counter()
+    error = None
+    try:
+        log_event(log, 'run_start', script='outlet_runner', outlet=job['outlet'], platform=job['platform'], input=job['inputs'])
+        if job['platform'] == 'zomato':
+            # One process per outlet already, the invoices of an outlet are parsed serially
+            args = zomato_predective_analysis.parse_args(
+                ['--input-dir', job['inputs'][0], '--workers', '1', '--forecast-days', str(forecast_days)] + shared_argv)
+            zomato_predective_analysis.run_pipeline(args, metrics, log)
+        else:
+            args = swiggy_analysis.parse_args(['--input', *job['inputs']] + shared_argv)
+            swiggy_analysis.run_batch(args, metrics, log)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        log_event(log, 'run_failed', error=error)
+    finally:
+        close_run_log(log, metrics)
+        os.chdir(previous_dir)
+    return {**job, 'seconds': time.perf_counter() - start_time, 'metrics': metrics, 'error': error}
+
+def run_outlets(jobs, shared_argv, forecast_days, workers, metrics=None, log=None):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_outlet_job, job, shared_argv, forecast_days) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            merge_metrics(metrics, result['metrics'])
+            log_event(log, 'outlet_done', outlet=result['outlet'], platform=result['platform'],
+                      seconds=round(result['seconds'], 3), error=result['error'])
+            status = f"failed ({result['error']})" if result['error'] else 'done'
+            print(f"{result['outlet']}/{result['platform']}: {status} in {result['seconds']:.1f}s")
+            results.append(result)
+    return results
+
+def load_outlet_tables(results):
+    # Every finished job's cube and orders, tagged with the outlet they came from
+    cubes = []
+    order_totals = []
+    for result in results:
+        if result['error']:
+            continue
+        store_dir, cube_dir = (os.path.join(result['output_dir'], path) for path in PLATFORM_OUTPUTS[result['platform']])
+        if cube_exists(cube_dir):
+            cubes.append(normalize_cube(load_cube(cube_dir)).assign(outlet=result['outlet']))
+        if order_store_exists(store_dir):
+            orders = read_orders(store_dir, ['platform', 'ordered_date_time', 'ordered_day', 'ordered_type', 'total_amount_cents', 'promo_cents'])
+            order_totals.append(order_value(orders, ['platform']).assign(
+                outlet=result['outlet'],
+                first_order=orders['ordered_date_time'].min(),
+                last_order=orders['ordered_date_time'].max(),
+            ))
+    if not cubes:
+        return None, None
+    # Each outlet has its own item categories, the stacked cube gets one set over all of them
+    cube = pd.concat(cubes, ignore_index=True)
+    cube['item_name'] = cube['item_name'].astype(str).astype('category')
+    cube['outlet'] = cube['outlet'].astype('category')
+    return cube, pd.concat(order_totals, ignore_index=True) if order_totals else None
+
+def combined_sheets(outlets, results, cube, order_totals):
+    outlet_info = pd.DataFrame(outlets)[['outlet', 'folder', 'restaurant_id', 'restaurant_name', 'restaurant_address']]
+    runs = pd.DataFrame([
+        {'outlet': result['outlet'], 'platform': result['platform'], 'input_files': len(result['inputs']),
+         'input_bytes': result['input_bytes'], 'seconds': round(result['seconds'], 3), 'error': result['error']}
+        for result in results
+    ])
+    summary = runs.merge(outlet_info, on='outlet', how='left')
+    if order_totals is not None:
+        summary = summary.merge(in_rupees(order_totals).astype({'platform': str}), on=['outlet', 'platform'], how='left')
+
+    def in_rupee_columns(totals):
+        totals = totals.astype({col: str for col in totals.columns if totals[col].dtype == 'category'})
+        totals['revenue'] = cents_to_rupees(totals.pop('revenue_cents')).to_numpy()
+        return totals
+
+    return {
+        'outlets': summary.sort_values(['outlet', 'platform']),
+        # Cube rows are additive, so every cross-outlet view is a roll-up of the stacked cubes
+        'outlet_items': in_rupee_columns(cube_rollup(cube, ['outlet', 'platform']).sort_values(['outlet', 'quantity'], ascending=[True, False])),
+        'items': in_rupee_columns(cube_rollup(cube).sort_values('quantity', ascending=False)),
+        'day_meal_items': in_rupee_columns(cube_rollup(cube, ['day', 'meal_type']).sort_values(['ordered_day', 'ordered_type', 'quantity'], ascending=[True, True, False])),
+    }
+
+def write_combined_rollup(outlets, results, output_dir, report_format):
+    cube, order_totals = load_outlet_tables(results)
+    if cube is None:
+        print('No outlet produced a rollup cube, nothing to combine')
+        return
+    combined_dir = os.path.join(output_dir, COMBINED_DIR)
+    os.makedirs(combined_dir, exist_ok=True)
+    cube.to_parquet(os.path.join(combined_dir, 'outlet_cube.parquet'), index=False)
+    write_report(combined_sheets(outlets, results, cube, order_totals), os.path.join(combined_dir, 'outlet_rollup.xlsx'), report_format)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run both pipelines for every outlet in parallel and combine their rollups')
+    parser.add_argument('--root', default='outlets', help='Folder with one sub-folder (or loose Swiggy export) per outlet')
+    parser.add_argument('--output-dir', default='outlet_results', help='Each outlet writes to <output-dir>/<outlet>/<platform>')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Outlet jobs run at the same time')
+    parser.add_argument('--forecast-days', type=int, default=7, help='Days the Zomato pipeline forecasts, 0 skips the forecast')
+    parser.add_argument('--raw-item-names', action='store_true', help='Count items under their raw platform names')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='xlsx',
+                        help='xlsx workbooks, or one csv/parquet file per sheet')
+    parser.add_argument('--meal-slots', help='Meal slot hours, e.g. BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24')
+    parser.add_argument('--closed', help='Days every outlet was closed, e.g. Monday,Sunday:BREAKFAST,2023-08-15')
+    parser.add_argument('--log-file', default='outlet_run_log.jsonl', help='JSON-lines log of this run, empty to disable')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    outlets = discover_outlets(args.root)
+    if not outlets:
+        raise FileNotFoundError(f'No outlet inputs found under {args.root}')
+    jobs = outlet_jobs(outlets, args.output_dir)
+    print(f'{len(outlets)} outlets, {len(jobs)} jobs on {args.workers} workers')
+
+    metrics = new_metrics()
+    log = open_run_log(args.log_file)
+    log_event(log, 'run_start', script='outlet_runner', root=args.root, outlets=[outlet['outlet'] for outlet in outlets], workers=args.workers)
+    start_time = time.perf_counter()
+    try:
+        results = run_outlets(jobs, pipeline_argv(args), args.forecast_days, args.workers, metrics, log)
+        write_combined_rollup(outlets, results, args.output_dir, args.report_format)
+    finally:
+        close_run_log(log, metrics)
+
+    wall_seconds = time.perf_counter() - start_time
+    job_seconds = sum(result['seconds'] for result in results)
+    print_run_summary(metrics, 'All outlets')
+    print(f'{job_seconds:.1f}s of outlet jobs in {wall_seconds:.1f}s wall time')
+
+if __name__ == "__main__":
+    main()
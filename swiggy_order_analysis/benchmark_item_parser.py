@@ -0,0 +1,103 @@
+import argparse
+import time
+
+import pandas as pd
+
+from swiggy_analysis import EXPORT_PREAMBLE_ROWS, iter_csv_chunks
+from swiggy_item_parser import item_field_columns, parse_export_items
+
+# The row-wise chain swiggy_analysis used before the vectorized parser, kept as the baseline
+
+def concatenate_values(row):
+    item_name = row['Item1-name_reward_type_quantity_price+Variants+Addons']
+
+    # Iterate through columns that start with 'Unnamed' and concatenate their values with "  "
+    for col_name, col_value in row.items():
+        if col_name.startswith('Unnamed') and not pd.isna(col_value):
+            item_name += '**' + str(col_value)  # Convert float to string
+
+    return item_name
+
+def clean_item(item):
+    cleaned_item = item.split('+')[0].replace('_NA_', ' ').replace('_', ' ')
+    return cleaned_item
+
+def create_item_dicts(split_items):
+    item_dicts = []
+    for item in split_items:
+        parts = item.split(' ')
+        if len(parts) >= 2:
+            item_name = ' '.join(parts[:-2])
+            item_quantity = parts[-2]
+            item_dicts.append({'item_name': item_name, 'item_quantity': item_quantity})
+    return item_dicts
+
+def legacy_item_totals(df):
+    df = df.copy()
+    df['item_name'] = df.apply(concatenate_values, axis=1)
+    df['item_analysed'] = df['item_name'].apply(lambda x: x.split('**'))
+    df['cleaned_item'] = df['item_analysed'].apply(lambda items: ', '.join([clean_item(item) for item in items]))
+    df['split_items'] = df['cleaned_item'].apply(lambda x: x.split(', '))
+    df['item_dicts'] = df['split_items'].apply(create_item_dicts)
+
+    item_totals = {}
+    for item_dicts in df['item_dicts']:
+        for item_dict in item_dicts:
+            item_quantity = ''.join(filter(str.isdigit, item_dict['item_quantity']))
+            item_totals[item_dict['item_name']] = item_totals.get(item_dict['item_name'], 0) + (int(item_quantity) if item_quantity else 0)
+    return pd.Series(item_totals, dtype='int64')
+
+def vectorized_item_totals(df):
+    items = parse_export_items(df)
+    return items.groupby('item_name')['quantity'].sum()
+
+def load_export(path):
+    if path.lower().endswith('.csv'):
+        df = pd.concat(iter_csv_chunks(path, 5000), ignore_index=True)
+    else:
+        df = pd.read_excel(path, skiprows=EXPORT_PREAMBLE_ROWS)
+    df.columns = df.columns.str.strip()
+    return df[['Order ID'] + item_field_columns(df)].reset_index(drop=True)
+
+def time_parser(parser, df, repeat):
+    # Best of `repeat` runs
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = parser(df)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings), result
+
+# The speedup depends on the input and its size: on one machine a 510-order CSV export gave 1.4x at
+# --scale 1 and 2.6x at --scale 20, and the 308-order aug-sept_orders.xlsx 1.2x at --scale 1.
+# At the bundled sizes the fixed per-call cost of the vectorized parser takes most of the gain
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized Swiggy item parser against the row-wise chain')
+    parser.add_argument('--input', default='aug-sept_orders.xlsx', help='Swiggy order export (.xlsx or .csv)')
+    parser.add_argument('--scale', type=int, default=1, help='Repeat the export rows this many times')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per parser, the best one is reported')
+    args = parser.parse_args()
+
+    df = load_export(args.input)
+    if args.scale > 1:
+        df = pd.concat([df] * args.scale, ignore_index=True)
+
+    legacy_seconds, legacy_totals = time_parser(legacy_item_totals, df, args.repeat)
+    vectorized_seconds, vectorized_totals = time_parser(vectorized_item_totals, df, args.repeat)
+
+    print(f'{len(df)} orders from {args.input}')
+    print(f'row-wise chain : {legacy_seconds * 1000:8.1f} ms ({len(df) / legacy_seconds:10.0f} orders/sec)')
+    print(f'vectorized     : {vectorized_seconds * 1000:8.1f} ms ({len(df) / vectorized_seconds:10.0f} orders/sec)')
+    print(f'speedup        : {legacy_seconds / vectorized_seconds:8.1f}x')
+
+    # The old chain also splits names on ', ' and reads '(4 Pcs)' as a quantity of 4, so report where they disagree
+    legacy_totals = legacy_totals.groupby(legacy_totals.index.str.split().str.join(' ')).sum()
+    comparison = pd.concat([legacy_totals.rename('row_wise'), vectorized_totals.rename('vectorized')], axis=1).fillna(0)
+    differing = comparison[comparison['row_wise'] != comparison['vectorized']]
+    print(f'total quantity : row-wise {int(comparison["row_wise"].sum())}, vectorized {int(comparison["vectorized"].sum())}')
+    print(f'{len(comparison) - len(differing)} of {len(comparison)} item names agree')
+    if len(differing):
+        print(differing.head(20).to_string())
+
+if __name__ == "__main__":
+    main()
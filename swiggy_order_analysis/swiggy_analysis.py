@@ -1,133 +1,366 @@
 import pandas as pd
-from datetime import datetime
-import re
+import os
+import sys
+import csv
+import argparse
+from openpyxl import load_workbook
 
-def concatenate_values(row):
-    item_name = row['Item1-name_reward_type_quantity_price+Variants+Addons']
-    
-    # Iterate through columns that start with 'Unnamed' and concatenate their values with "  "
-    for col_name, col_value in row.items():
-        if col_name.startswith('Unnamed') and not pd.isna(col_value):
-            item_name += '**' + str(col_value)  # Convert float to string
-    
-    return item_name
+# Shared order tooling lives in order_common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from order_common.calendar_exposure import check_closure_args, exposure_for, parse_closures, with_occurrence_averages
+from order_common.instrumentation import (
+    close_run_log, count, log_event, new_metrics, open_run_log, print_run_summary, profiled, timed
+)
+from order_common.item_canonical import canonical_item_names
+from order_common.order_history import load_order_history, write_order_history
+from order_common.order_store import parse_amount_cents, write_order_store
+from order_common.report_writer import REPORT_FORMATS, write_report
+from order_common.revenue import revenue_sheets
+from order_common.rollup_cube import cube_rollup, update_cube
+from order_common.timestamps import MEAL_SLOTS, meal_slots_for, parse_meal_slots, parse_swiggy_timestamps, weekday_names
+from order_common.item_aggregation import aggregate_items, explode_order_items
+from swiggy_item_parser import parse_export_items, summarize_items
 
-def clean_item(item):
-    cleaned_item = item.split('+')[0].replace('_NA_', ' ').replace('_', ' ')
-    return cleaned_item
+ORDER_STORE_DIR = 'order_store'
+ROLLUP_CUBE_DIR = 'rollup_cube'
+ORDER_HISTORY_DIR = 'order_history'
 
-def get_weekday(date_str):
-    try:
-        date = datetime.strptime(str(date_str), '%Y-%m-%d %H:%M:%S')
-        return date.strftime('%A')  # Return the full weekday name
-    except ValueError:
-        return None
-
-
-def create_item_dicts(split_items):
-    item_dicts = []
-    for item in split_items:
-        parts = item.split(' ')
-        if len(parts) >= 2:
-            item_name = ' '.join(parts[:-2])
-            item_quantity = parts[-2]
-            item_dicts.append({'item_name': item_name, 'item_quantity': item_quantity})
-    return item_dicts
-
-
-def extract_item_data(df):
-    # Initialize empty lists to store the extracted data
-    item_names = []
-    item_quantities = []
-    week_days = []
-
-    # Iterate through rows in df
-    for index, row in df.iterrows():
-        week_day = row['week_day']
-        item_dicts = row['item_dicts']
-
-        # Create a dictionary to store item_name and its corresponding total quantity
-        item_name_quantity_dict = {}
-
-        # Iterate through the item_dicts list for each row
-        for item_dict in item_dicts:
-            item_name = item_dict['item_name']
-            item_quantity = item_dict['item_quantity']
-
-            # Extract valid integers from item_quantity, e.g., '(4' -> '4'
-            item_quantity = ''.join(filter(str.isdigit, item_quantity))
-
-            # Convert to int for summation
-            item_quantity = int(item_quantity) if item_quantity else 0
-
-            # Add the item_quantity to the existing value (if it exists) or set it as the initial value
-            if item_name in item_name_quantity_dict:
-                item_name_quantity_dict[item_name] += item_quantity
-            else:
-                item_name_quantity_dict[item_name] = item_quantity
+# Report lines above the header row of a Swiggy export
+EXPORT_PREAMBLE_ROWS = 5
+MAX_ITEM_OVERFLOW_COLUMNS = 32
+CHUNK_SIZE = 5000
 
-        # Append the data to the respective lists
-        for item_name, item_quantity in item_name_quantity_dict.items():
-            item_names.append(item_name)
-            item_quantities.append(item_quantity)
-            week_days.append(week_day)
+BASE_COLUMNS = ['Order ID', 'Order-relay-time(ordered time)', 'Total-bill-amount <bill>', 'Item-count', 'Item1-name_reward_type_quantity_price+Variants+Addons']
+# The restaurant funded discounts, Swiggy's promo on the order. Older exports may lack them
+DISCOUNT_COLUMNS = ['Restaurant Trade Discount', 'Restaurant Coupon Discount Share']
+# An order is the same order in every export it appears in
+ORDER_KEY_COLUMNS = ['Order ID', 'Order-relay-time(ordered time)']
+
+def extract_item_data(orders, items, week_day=None):
+    # Explode the orders into one long item table, optionally for a single weekday
+    long_items = explode_order_items(orders, items, ['order', 'day'])
+    if week_day:
+        long_items = long_items[long_items['ordered_day'] == week_day]
+
+    # Sum the quantity of each item within each order in a single groupby
+    item_totals = aggregate_items(long_items, ['order', 'day'])
 
     # Create a new DataFrame with the extracted data
-    new_df = pd.DataFrame({'item_name': item_names, 'item_quantity': item_quantities, 'week_day': week_days})
+    new_df = pd.DataFrame({
+        'item_name': item_totals['item_name'].astype(str),
+        'item_quantity': item_totals['quantity'],
+        'week_day': item_totals['ordered_day'].astype(str)
+    })
     return new_df
 
 
-def main():
-    # Read the Excel file and skip rows
-    df = pd.read_excel('aug-sept_orders.xlsx', skiprows=5, converters={'Order ID': int})
+def build_order_tables(df, meal_slots=MEAL_SLOTS, metrics=None):
+    # Split the export into an order table and a normalized item child table
+    ordered_date_time = df['Order-relay-time(ordered time)']
+
+    # Amounts in paise, the discounts are stored negative like a Zomato promo
+    discount_cents = sum(parse_amount_cents(df[col]).fillna(0) for col in DISCOUNT_COLUMNS if col in df.columns)
+    orders = pd.DataFrame({
+        'platform': 'swiggy',
+        'order_id': df['Order ID'].to_numpy(),
+        'ordered_date_time': ordered_date_time.to_numpy(),
+        'ordered_day': df['week_day'].to_numpy(),
+        'ordered_type': meal_slots_for(ordered_date_time, meal_slots),
+        'total_amount_cents': parse_amount_cents(df['Total-bill-amount <bill>']).array,
+        'promo_cents': -pd.Series(discount_cents, index=df.index).to_numpy(dtype='int64'),
+    })
+
+    # Every item field of every order parsed in one vectorized pass
+    items = parse_export_items(df, metrics).assign(platform='swiggy')
+    return orders, items
+
+
+def normalize_export(df, previous_week_day=None):
     df.columns = df.columns.str.strip()
 
-    # Define the columns to keep
-    columns_to_keep = ['Order ID', 'Order-relay-time(ordered time)', 'Total-bill-amount <bill>', 'Item-count', 'Item1-name_reward_type_quantity_price+Variants+Addons'] + [f'Unnamed: {i}' for i in range(31, 35)]
+    # Define the columns to keep, the item overflow lands in the 'Unnamed' columns
+    item_overflow_columns = [col for col in df.columns if col.startswith('Unnamed')]
+    columns_to_keep = BASE_COLUMNS + [col for col in DISCOUNT_COLUMNS if col in df.columns] + item_overflow_columns
 
     # Drop all other columns
-    df = df[columns_to_keep]
+    df = df[columns_to_keep].copy()
+
+    # Parse the order times as one column and derive 'week_day' from them, unparseable times become NaT
+    df['Order-relay-time(ordered time)'] = parse_swiggy_timestamps(df['Order-relay-time(ordered time)'])
+    df['week_day'] = weekday_names(df['Order-relay-time(ordered time)'])
 
-    # Apply the function to create the 'item_name' column
-    df['item_name'] = df.apply(concatenate_values, axis=1)
+    # Fill missing 'week_day' values with the weekday of the previous row,
+    # carrying the last weekday over from the previous chunk when streaming
+    if previous_week_day is not None and len(df) and pd.isna(df['week_day'].iloc[0]):
+        df.loc[df.index[0], 'week_day'] = previous_week_day
+    df['week_day'] = df['week_day'].ffill()
+    return df.reset_index(drop=True)
 
-    # Apply the function to create the 'item_analysed' column
-    df['item_analysed'] = df['item_name'].apply(lambda x: x.split('**'))
+def drop_duplicate_orders(df, metrics=None, seen_orders=None):
+    # Exports of one outlet with overlapping date ranges repeat orders, each order is counted once.
+    # Streaming passes the keys of the earlier chunks in seen_orders
+    duplicated = df.duplicated(ORDER_KEY_COLUMNS).to_numpy()
+    if seen_orders is not None:
+        keys = list(zip(df['Order ID'], df['Order-relay-time(ordered time)']))
+        duplicated = duplicated | [key in seen_orders for key in keys]
+        seen_orders.update(keys)
+    count(metrics, 'duplicate_orders', int(duplicated.sum()))
+    return df[~duplicated].reset_index(drop=True)
 
-    # Clean each item in the 'item_analysed' column and join them back into a single string
-    df['cleaned_item'] = df['item_analysed'].apply(lambda items: ', '.join([clean_item(item) for item in items]))
+def read_preamble_rows(path):
+    # The report lines above the header, as lists of cell values
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            return [next(reader, []) for _ in range(EXPORT_PREAMBLE_ROWS)]
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [list(row) for row in workbook.active.iter_rows(max_row=EXPORT_PREAMBLE_ROWS, values_only=True)]
+    finally:
+        workbook.close()
+
+def read_export_metadata(path):
+    # 'Restaurant Id :', '430352' / 'Restaurant Name & Address :', name, address / 'Duration :', first, last
+    metadata = {'restaurant_id': None, 'restaurant_name': None, 'restaurant_address': None, 'duration_start': None, 'duration_end': None}
+    for row in read_preamble_rows(path):
+        values = [str(value).strip() for value in row if value is not None and str(value).strip()]
+        if len(values) < 2:
+            continue
+        label = values[0].rstrip(':').strip()
+        if label == 'Restaurant Id':
+            metadata['restaurant_id'] = values[1]
+        elif label == 'Restaurant Name & Address':
+            metadata['restaurant_name'] = values[1]
+            metadata['restaurant_address'] = values[2] if len(values) > 2 else None
+        elif label == 'Duration':
+            metadata['duration_start'] = values[1]
+            metadata['duration_end'] = values[2] if len(values) > 2 else None
+    return metadata
 
-    # Add a new column 'week_day' representing the weekday of 'Order-relay-time(ordered time)'
-    df['week_day'] = df['Order-relay-time(ordered time)'].apply(get_weekday)
+def read_export(path):
+    # The whole export as one frame, the CSV padded for the item overflow columns
+    if path.lower().endswith('.csv'):
+        return pd.concat(iter_csv_chunks(path, CHUNK_SIZE), ignore_index=True)
+    return pd.read_excel(path, skiprows=EXPORT_PREAMBLE_ROWS, converters={'Order ID': int})
 
-    # Fill missing 'week_day' values with the weekday of the previous row
-    df['week_day'].fillna(method='ffill', inplace=True)
+def read_csv_header(path):
+    # The export starts with a few report lines before the real header row
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        for _ in range(EXPORT_PREAMBLE_ROWS):
+            next(reader)
+        return [name.strip() for name in next(reader)]
 
-    # Split each item in the 'cleaned_item' column by commas
-    df['split_items'] = df['cleaned_item'].apply(lambda x: x.split(', '))
+def iter_csv_chunks(path, chunksize):
+    # Items beyond the first spill into unnamed trailing columns, so the header is padded
+    header = read_csv_header(path)
+    names = header + [f'Unnamed: {i}' for i in range(len(header), len(header) + MAX_ITEM_OVERFLOW_COLUMNS)]
+    reader = pd.read_csv(path, skiprows=EXPORT_PREAMBLE_ROWS + 1, header=None, names=names,
+                         chunksize=chunksize, encoding='utf-8-sig')
+    for chunk in reader:
+        # Drop the padding columns no row in this chunk used
+        unused_columns = [col for col in chunk.columns if col.startswith('Unnamed') and chunk[col].isna().all()]
+        yield chunk.drop(columns=unused_columns)
+
+def iter_xlsx_chunks(path, chunksize):
+    # Read-only openpyxl streams rows without loading the whole sheet
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        for _ in range(EXPORT_PREAMBLE_ROWS):
+            next(rows)
+        header = next(rows)
+        names = [str(name).strip() if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
 
-    # Create dictionaries for each item in the 'split_items' column
-    df['item_dicts'] = df['split_items'].apply(create_item_dicts)
-    df.to_excel('order_summary.xlsx', index=False)
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunksize:
+                yield pd.DataFrame(buffer, columns=names)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=names)
+    finally:
+        workbook.close()
+
+def iter_export_chunks(path, chunksize=CHUNK_SIZE):
+    if path.lower().endswith('.csv'):
+        return iter_csv_chunks(path, chunksize)
+    return iter_xlsx_chunks(path, chunksize)
+
+def stream_item_totals(paths, dimensions=('day',), chunksize=CHUNK_SIZE, meal_slots=MEAL_SLOTS, metrics=None, order_times=None):
+    # Normalize and aggregate one chunk at a time, only the running totals stay in memory.
+    # Several exports of one outlet stream one after the other
+    item_totals = None
+    previous_week_day = None
+    seen_orders = set()
+    paths = [paths] if isinstance(paths, str) else paths
+    chunks = (chunk for path in paths for chunk in iter_export_chunks(path, chunksize))
+    while True:
+        with timed(metrics, 'read'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with timed(metrics, 'normalize', rows=len(chunk)):
+            chunk = chunk[chunk['Order ID'].notna()]
+            chunk = normalize_export(chunk, previous_week_day)
+            chunk = drop_duplicate_orders(chunk, metrics, seen_orders)
+        if chunk.empty:
+            continue
+        previous_week_day = chunk['week_day'].iloc[-1]
+        count(metrics, 'orders', len(chunk))
+        count(metrics, 'unparsed_order_times', chunk['Order-relay-time(ordered time)'].isna().sum())
+        if order_times is not None:
+            # The first and last order time of every chunk are enough for the calendar exposure
+            order_times += [chunk['Order-relay-time(ordered time)'].min(), chunk['Order-relay-time(ordered time)'].max()]
+
+        with timed(metrics, 'parse_items', rows=len(chunk)):
+            orders, items = build_order_tables(chunk, meal_slots, metrics)
+        with timed(metrics, 'aggregate', rows=len(items)):
+            chunk_totals = aggregate_items(explode_order_items(orders, items, dimensions), dimensions)
+            if item_totals is not None:
+                chunk_totals = pd.concat([item_totals, chunk_totals], ignore_index=True)
+            item_totals = aggregate_items(chunk_totals, dimensions)
+    return item_totals
+
+def item_totals_report(item_totals, exposure=None):
+    # With an exposure the quantity is also averaged over how often each weekday was open
+    report_columns = ['week_day', 'item_name', 'item_quantity']
+    if exposure is not None:
+        item_totals = with_occurrence_averages(item_totals, exposure)
+        report_columns += ['occurrences', 'avg_item_quantity']
+    return (
+        item_totals.rename(columns={'ordered_day': 'week_day', 'quantity': 'item_quantity', 'avg_quantity': 'avg_item_quantity'})
+        .astype({'week_day': str, 'item_name': str})
+        .sort_values(['week_day', 'item_quantity', 'item_name'], ascending=[True, False, True])
+        [report_columns]
+    )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Summarise the items in a Swiggy order export')
+    parser.add_argument('--input', nargs='+', default=['aug-sept_orders.xlsx'],
+                        help='Swiggy order exports (.xlsx or .csv) of one outlet, e.g. one per month')
+    parser.add_argument('--weekday', default='Wednesday', help='Weekday for the filtered item summary')
+    parser.add_argument('--stream', action='store_true',
+                        help='Aggregate the export chunk by chunk with bounded memory, only item totals are written')
+    parser.add_argument('--from-history', action='store_true',
+                        help='Summarize the weekday items from the stored order history instead of reading the exports')
+    parser.add_argument('--start', help='With --from-history, first date to include, e.g. 2023-08-01')
+    parser.add_argument('--end', help='With --from-history, date to stop before, e.g. 2023-09-01')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help='Rows per chunk in streaming mode')
+    parser.add_argument('--rebuild-cube', action='store_true', help='Aggregate every day into the rollup cube again')
+    parser.add_argument('--raw-item-names', action='store_true', help='Count items under their raw export names')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='xlsx',
+                        help='xlsx writes one workbook, csv/parquet write one file per sheet')
+    parser.add_argument('--meal-slots', type=parse_meal_slots, default=MEAL_SLOTS,
+                        help='Meal slot hours, e.g. BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24')
+    parser.add_argument('--closed', type=parse_closures,
+                        help='Days the outlet was closed, left out of the per-day averages, e.g. Monday,Sunday:BREAKFAST,2023-08-15,2023-10-20..2023-10-24')
+    parser.add_argument('--log-file', default='run_log.jsonl', help='JSON-lines log of this run, empty to disable')
+    parser.add_argument('--verbose', action='store_true', help='Print the orders of the selected weekday')
+    parser.add_argument('--profile', help='Write cProfile stats of this run to this file')
+    return check_closure_args(parser, parser.parse_args(argv))
+
+def write_logged_report(sheets, path, report_format, metrics, log):
+    with timed(metrics, 'report_write', rows=sum(len(df) for df in sheets.values())):
+        written = write_report(sheets, path, report_format)
+    log_event(log, 'report_written' if written else 'report_unchanged', path=path)
+
+def run_stream(args, metrics, log):
+    order_times = []
+    item_totals = stream_item_totals(args.input, ['day'], args.chunksize, args.meal_slots, metrics, order_times)
+    if not args.raw_item_names:
+        with timed(metrics, 'canonicalize', rows=len(item_totals)):
+            item_totals = aggregate_items(canonical_item_names(item_totals), ['day'])
+    exposure = exposure_for(order_times, args.meal_slots, args.closed)
+    write_logged_report({'item_totals': item_totals_report(item_totals, exposure)}, 'item_totals.xlsx', args.report_format, metrics, log)
+
+def run_batch(args, metrics, log):
+    # Read every export of the outlet into one frame
+    with timed(metrics, 'read'):
+        df = pd.concat([read_export(path) for path in args.input], ignore_index=True)
+    with timed(metrics, 'normalize', rows=len(df)):
+        df = normalize_export(df)
+        df = drop_duplicate_orders(df, metrics)
+    count(metrics, 'orders', len(df))
+    count(metrics, 'unparsed_order_times', df['Order-relay-time(ordered time)'].isna().sum())
+    with timed(metrics, 'parse_items', rows=len(df)):
+        orders, items = build_order_tables(df, args.meal_slots, metrics)
+        df['items'] = summarize_items(items, len(df))
+
+    # The typed columnar store is the canonical copy, the reports are only exports
+    with timed(metrics, 'store_write', rows=len(orders)):
+        orders, items = write_order_store(ORDER_STORE_DIR, orders, items)
+    # Day partitions of the same orders, so weekday and range queries only open the days they ask for
+    with timed(metrics, 'history_write', rows=len(orders)):
+        write_order_history(ORDER_HISTORY_DIR, orders, items, metrics)
+    # Count the same dish under one name whatever variant text or spelling it was ordered with
+    if not args.raw_item_names:
+        with timed(metrics, 'canonicalize', rows=len(items)):
+            items = canonical_item_names(items)
+    # Only the days with new or changed orders are aggregated into the cube again
+    with timed(metrics, 'cube_update', rows=len(items)):
+        cube = update_cube(ROLLUP_CUBE_DIR, orders, items, args.rebuild_cube, metrics)
+    with timed(metrics, 'aggregate', rows=len(cube)):
+        item_totals = cube_rollup(cube, ['day'], args.meal_slots)
+    exposure = exposure_for(orders['ordered_date_time'], args.meal_slots, args.closed)
     
-    columns_to_filter = ['Order ID', 'Order-relay-time(ordered time)', 'Total-bill-amount <bill>', 'Item-count', 'week_day', 'item_dicts']
+    columns_to_filter = ['Order ID', 'Order-relay-time(ordered time)', 'Total-bill-amount <bill>', 'Item-count', 'week_day', 'items']
     filtered_df = df[columns_to_filter]
-    filtered_df.to_excel('filtered_order_summary.xlsx', index=False)
     
     # Filter the filtered_df with the given weekday
-    desired_week_day = 'Wednesday'  # Replace with your desired week day
-    filtered_df = df[df['week_day'] == desired_week_day]
-    print(filtered_df)
+    desired_week_day = args.weekday
+    weekday_df = df[df['week_day'] == desired_week_day]
+    if args.verbose:
+        print(weekday_df)
+    log_event(log, 'weekday_orders', weekday=desired_week_day, orders=len(weekday_df))
 
     # Extract item data
-    new_df = extract_item_data(filtered_df)
+    with timed(metrics, 'aggregate', rows=len(items)):
+        new_df = extract_item_data(orders, items, desired_week_day)
 
-    # Save the DataFrames to Excel files
-    filtered_df.to_excel('filtered-order_summary.xlsx', index=False)
-    df.to_excel('order_summary.xlsx', index=False)
-    new_df.to_excel('item_summary.xlsx', index=False)
+    # Every export goes into one workbook, each former file becomes a sheet
+    write_logged_report({
+        'order_summary': df,
+        'filtered_order_summary': filtered_df,
+        f'{desired_week_day}_orders': weekday_df,
+        'item_summary': new_df,
+        'item_totals': item_totals_report(item_totals, exposure),
+    }, 'swiggy_reports.xlsx', args.report_format, metrics, log)
 
-    
+    # Revenue, discount share and average order value per weekday and meal slot
+    with timed(metrics, 'revenue', rows=len(items)):
+        sheets = revenue_sheets(orders, items, ['day', 'meal_type'], exposure)
+    write_logged_report(sheets, 'revenue.xlsx', args.report_format, metrics, log)
+
+def run_history_query(args, metrics, log):
+    # Only the day partitions of the weekday (and date range) are opened, the exports are not read at all
+    with timed(metrics, 'history_read'):
+        orders, items = load_order_history(ORDER_HISTORY_DIR, args.start, args.end, [args.weekday], metrics=metrics)
+    count(metrics, 'orders', len(orders))
+    if not args.raw_item_names:
+        with timed(metrics, 'canonicalize', rows=len(items)):
+            items = canonical_item_names(items)
+    with timed(metrics, 'aggregate', rows=len(items)):
+        new_df = extract_item_data(orders, items, args.weekday)
+    write_logged_report({'item_summary': new_df}, f'{args.weekday}_item_summary.xlsx', args.report_format, metrics, log)
+
+def main():
+    args = parse_args()
+    metrics = new_metrics()
+    log = open_run_log(args.log_file)
+    log_event(log, 'run_start', script='swiggy_analysis', input=args.input, stream=args.stream)
+    try:
+        with profiled(args.profile):
+            if args.from_history:
+                run_history_query(args, metrics, log)
+            elif args.stream:
+                run_stream(args, metrics, log)
+            else:
+                run_batch(args, metrics, log)
+    finally:
+        close_run_log(log, metrics)
+    print_run_summary(metrics)
 
 if __name__ == "__main__":
     main()
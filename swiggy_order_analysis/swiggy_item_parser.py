@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from order_common.instrumentation import count
+from order_common.order_store import parse_amount_cents
+
+ITEM_FIELD = 'Item1-name_reward_type_quantity_price+Variants+Addons'
+
+# 'Rice Kheer_NA_2_108+Variant text+Addon text' -> name, reward type, quantity, line price, variants, addons
+ITEM_FIELD_PATTERN = (
+    r'^(?P<item_name>[^+]+)_(?P<reward_type>[^_+]*)_(?P<quantity>\d+)_(?P<price>\d+(?:\.\d+)?)'
+    r'(?:\+(?P<variants>[^+]*))?(?:\+(?P<addons>.*))?$'
+)
+
+ITEM_COLUMNS = ['order_index', 'order_id', 'item_position', 'item_name', 'reward_type', 'quantity', 'price_cents', 'unit_price_cents', 'variants', 'addons']
+
+
+def item_field_columns(df):
+    # The first item has a named column, every further item spills into an 'Unnamed' column
+    return [ITEM_FIELD] + [col for col in df.columns if col.startswith('Unnamed')]
+
+def parse_export_items(df, metrics=None):
+    # Melt the item columns into one Series, keeping each field's row and position in the order
+    item_fields = df[item_field_columns(df)].to_numpy(dtype=object)
+    present = pd.notna(item_fields)
+    order_index, item_position = np.nonzero(present)
+    raw_items = pd.Series(item_fields[present], dtype='string').str.strip()
+
+    # One compiled regex over every item field at once
+    parts = raw_items.str.extract(ITEM_FIELD_PATTERN)
+    parsed = parts['quantity'].notna().to_numpy()
+
+    # The export prints the line total, the unit price is that over the quantity
+    quantity = parts['quantity'].astype('Float64')
+    price_cents = parse_amount_cents(parts['price'])
+    unit_price_cents = (price_cents.astype('Float64') / quantity.where(quantity > 0)).round().astype('Int64')
+    items = pd.DataFrame({
+        'order_index': order_index,
+        'order_id': df['Order ID'].to_numpy()[order_index],
+        'item_position': item_position,
+        'item_name': parts['item_name'].str.replace(r'[_\s]+', ' ', regex=True).str.strip().to_numpy(),
+        'reward_type': parts['reward_type'].to_numpy(),
+        'quantity': quantity.to_numpy(dtype='float64', na_value=np.nan),
+        'price_cents': price_cents.array,
+        'unit_price_cents': unit_price_cents.array,
+        'variants': parts['variants'].str.strip().to_numpy(),
+        'addons': parts['addons'].str.strip().to_numpy(),
+    }, columns=ITEM_COLUMNS)
+
+    # Fields that don't follow the export format are dropped, as the old chain did
+    count(metrics, 'unparsed_item_fields', (~parsed).sum())
+    items = items[parsed].reset_index(drop=True)
+    items['quantity'] = items['quantity'].astype('int64')
+    return items
+
+def summarize_items(items, order_count):
+    # 'Rice Kheer x2; Poori x1' per order, used only for the Excel exports
+    labels = items['item_name'] + ' x' + items['quantity'].astype(str)
+    summary = labels.groupby(items['order_index']).agg('; '.join)
+    return summary.reindex(np.arange(order_count), fill_value='').to_numpy()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# The pipelines import their own modules by name, as they do when run from their folder
+sys.path.extend([
+    REPO_DIR,
+    os.path.join(REPO_DIR, 'zomato_order_analysis'),
+    os.path.join(REPO_DIR, 'swiggy_order_analysis'),
+    os.path.join(REPO_DIR, 'benchmarks'),
+    os.path.join(REPO_DIR, 'ingestion'),
+])
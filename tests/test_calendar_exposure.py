@@ -0,0 +1,18 @@
+import pytest
+
+from order_common.calendar_exposure import meal_slot_occurrences, parse_closures
+from order_common.timestamps import parse_meal_slots
+
+
+def test_unknown_closure_slot_is_named():
+    with pytest.raises(ValueError, match="Unknown meal slot BRUNCH in closure 'Sunday:BRUNCH'"):
+        parse_closures('Monday,Sunday:BRUNCH', parse_meal_slots('BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24'))
+
+    # Checked against the slots of the run when they were not known while parsing
+    closures = parse_closures('2023-08-15:BRUNCH')
+    with pytest.raises(ValueError, match="Unknown meal slot BRUNCH in closure '2023-08-15:BRUNCH'"):
+        meal_slot_occurrences('2023-08-01', '2023-08-31', closures=closures)
+
+    occurrences = meal_slot_occurrences('2023-08-01', '2023-08-31', parse_meal_slots('BRUNCH=9-13,DINNER=18-24'), closures)
+    assert occurrences.loc['Tuesday', 'BRUNCH'] == 4
+    assert occurrences.loc['Tuesday', 'DINNER'] == 5
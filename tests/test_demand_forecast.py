@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from order_common.demand_forecast import fit_forecast_state
+
+
+def daily_history(days):
+    # Two items in two meal slots with a weekday pattern, one row per day each sold
+    rng = np.random.default_rng(0)
+    rows = [
+        (date, ordered_type, item_name, float(rng.integers(0, 4) + (date.weekday() >= 5)))
+        for date in pd.date_range('2023-08-01', periods=days, freq='D')
+        for ordered_type in ['LUNCH', 'DINNER']
+        for item_name in ['Rice Kheer', 'Ghanta Tarkari']
+    ]
+    daily = pd.DataFrame(rows, columns=['ordered_date', 'ordered_type', 'item_name', 'quantity'])
+    return daily[daily['quantity'] > 0].reset_index(drop=True)
+
+
+def test_reloaded_state_matches_full_refit(tmp_path):
+    state_path = str(tmp_path / 'forecast_state.parquet')
+    daily = daily_history(45)
+    fit_forecast_state(daily[daily['ordered_date'] < '2023-08-25'], state_path)
+
+    state, new_days = fit_forecast_state(daily, state_path)
+    full, _ = fit_forecast_state(daily, state_path, rebuild=True)
+
+    # The saved state stopped the day before 2023-08-24, which is fitted again
+    assert new_days == 45 - 23
+    assert state['last_date'] == full['last_date']
+    assert state['days_seen'] == full['days_seen']
+    rows = full['keys'].get_indexer(state['keys'])
+    for name in ['level', 'season', 'recent', 'abs_error', 'actual']:
+        assert np.allclose(state[name], full[name][rows])
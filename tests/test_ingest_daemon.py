@@ -0,0 +1,26 @@
+import pandas as pd
+
+from ingest_daemon import new_ingest_state, unseen_orders
+
+
+def order_tables(order_ids, ordered_date_times):
+    orders = pd.DataFrame({
+        'platform': 'zomato',
+        'order_id': pd.array(order_ids, dtype='Int64'),
+        'ordered_date_time': pd.to_datetime(pd.Series(ordered_date_times, dtype=object)),
+    })
+    items = pd.DataFrame({'order_index': range(len(orders)), 'item_name': 'Rice Kheer', 'quantity': 1})
+    return orders, items
+
+
+def test_orders_without_id_or_time_are_all_kept():
+    state = new_ingest_state()
+    orders, items = order_tables([None, None, 5100000001], [None, None, '2023-08-03 13:15'])
+    kept_orders, kept_items = unseen_orders(state, orders, items)
+    assert len(kept_orders) == 3
+    assert kept_items['order_index'].tolist() == [0, 1, 2]
+
+    # The next file repeats the order with an id, the two without one are new orders
+    kept_orders, _ = unseen_orders(state, orders, items)
+    assert kept_orders['order_id'].isna().all()
+    assert len(kept_orders) == 2
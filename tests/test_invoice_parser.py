@@ -0,0 +1,21 @@
+from datetime import datetime
+
+import fitz
+
+from invoice_parser import parse_invoice
+from synthetic_orders import INVOICE_FONT, invoice_lines, write_invoice_pdf
+
+ITEMS = [('Rice Kheer [100 ml]', 49, 2), ('Ghanta Tarkari', 99, 1)]
+
+
+def test_promo_listed_below_total_is_read(tmp_path):
+    # '... Promo -₹40.00 Total ₹…' reordered to '... Total ₹… Promo -₹40.00'
+    lines = invoice_lines(5100000001, datetime(2023, 8, 3, 13, 15), ITEMS)
+    lines = lines[:-4] + lines[-2:] + lines[-4:-2]
+    pdf_path = str(tmp_path / 'promo_after_total.pdf')
+    write_invoice_pdf(pdf_path, lines, fitz.Font(fontfile=INVOICE_FONT))
+
+    order_dict = parse_invoice(pdf_path)
+    assert order_dict['total_amount'] == lines[-3]
+    assert order_dict['promo'] == '-₹40.00'
+    assert len(order_dict['ordered_items_list']) == 2
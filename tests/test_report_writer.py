@@ -0,0 +1,14 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from order_common.report_writer import write_report
+
+
+def test_long_sheet_names_stay_unique(tmp_path):
+    long_name = 'Odisha Special Economic Egg Curry Thali'
+    sheets = {f'{long_name} LUNCH': pd.DataFrame({'quantity': [1]}), f'{long_name} DINNER': pd.DataFrame({'quantity': [2]})}
+    path = str(tmp_path / 'item_counts.xlsx')
+    write_report(sheets, path, skip_unchanged=False)
+
+    names = load_workbook(path, read_only=True).sheetnames
+    assert names == [long_name[:31], long_name[:29] + '~1']
@@ -0,0 +1,38 @@
+import csv
+
+import swiggy_analysis
+from order_common.instrumentation import new_metrics
+from order_common.order_store import read_order_store
+from synthetic_orders import SWIGGY_HEADER, SWIGGY_PREAMBLE, swiggy_row
+
+
+def write_export(path, order_numbers):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerows(SWIGGY_PREAMBLE)
+        writer.writerow(SWIGGY_HEADER)
+        writer.writerows(swiggy_row(order_number) for order_number in order_numbers)
+    return str(path)
+
+
+def test_overlapping_exports_count_each_order_once(tmp_path, monkeypatch):
+    # Orders 20-29 are in both exports
+    first = write_export(tmp_path / 'august.csv', range(0, 30))
+    second = write_export(tmp_path / 'september.csv', range(20, 50))
+    single = write_export(tmp_path / 'all.csv', range(0, 50))
+
+    monkeypatch.chdir(tmp_path)
+    metrics = new_metrics()
+    swiggy_analysis.run_batch(swiggy_analysis.parse_args(['--input', first, second, '--raw-item-names', '--log-file', '']), metrics, None)
+    orders, items = read_order_store(swiggy_analysis.ORDER_STORE_DIR)
+    assert metrics['counters']['duplicate_orders'] == 10
+    assert len(orders) == 50
+    assert orders['order_id'].is_unique
+
+    expected = swiggy_analysis.stream_item_totals(single)
+    streamed_metrics = new_metrics()
+    streamed = swiggy_analysis.stream_item_totals([first, second], metrics=streamed_metrics)
+    assert streamed_metrics['counters']['duplicate_orders'] == 10
+    assert streamed.sort_values(['ordered_day', 'item_name']).reset_index(drop=True).equals(
+        expected.sort_values(['ordered_day', 'item_name']).reset_index(drop=True))
+    assert items['quantity'].sum() == expected['quantity'].sum()
@@ -0,0 +1,34 @@
+import os
+from datetime import datetime
+
+import fitz
+
+import zomato_predective_analysis
+from order_common.instrumentation import new_metrics
+from order_common.order_store import read_order_store
+from synthetic_orders import INVOICE_FONT, invoice_lines, write_invoice_pdf
+from zomato_order_store import ORDER_STORE_DIR
+
+ITEMS = [('Rice Kheer [100 ml]', 49, 2), ('Ghanta Tarkari', 99, 1)]
+
+
+def test_invoice_without_order_id_is_stored(tmp_path, monkeypatch):
+    invoice_dir = tmp_path / 'zomato_orders'
+    invoice_dir.mkdir()
+    font = fitz.Font(fontfile=INVOICE_FONT)
+    write_invoice_pdf(str(invoice_dir / 'good.pdf'), invoice_lines(5100000001, datetime(2023, 8, 3, 13, 15), ITEMS), font)
+    # Same invoice without its 'Zomato order:' line
+    write_invoice_pdf(str(invoice_dir / 'no_id.pdf'), invoice_lines(5100000002, datetime(2023, 8, 4, 20, 5), ITEMS)[1:], font)
+
+    monkeypatch.chdir(tmp_path)
+    args = zomato_predective_analysis.parse_args(['--input-dir', str(invoice_dir), '--no-cache', '--raw-item-names', '--forecast-days', '0'])
+    metrics = new_metrics()
+    zomato_predective_analysis.run_pipeline(args, metrics, None)
+
+    orders, items = read_order_store(ORDER_STORE_DIR)
+    assert metrics['counters']['missing_order_id'] == 1
+    assert len(orders) == 2
+    assert orders['order_id'].isna().sum() == 1
+    assert orders['order_id'].dropna().tolist() == [5100000001]
+    assert len(items) == 4
+    assert os.path.exists(os.path.join('result', 'item_counts.xlsx'))
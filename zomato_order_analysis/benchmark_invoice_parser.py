@@ -0,0 +1,43 @@
+import argparse
+
+from invoice_parser import measure_invoice, new_parser_stats, parse_invoice, summarize_parser_stats
+from zomato_predective_analysis import extract_order_dict_legacy, list_pdf_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the single-pass invoice parser with the legacy extractors')
+    parser.add_argument('--input-dir', default='zomato_orders', help='Directory holding the invoice PDFs')
+    parser.add_argument('--limit', type=int, default=None, help='Only parse the first N PDFs')
+    parser.add_argument('--trace-alloc', action='store_true',
+                        help='Record peak Python allocations per invoice (slows both parsers down)')
+    args = parser.parse_args()
+
+    file_list = sorted(list_pdf_files(args.input_dir))[:args.limit]
+
+    legacy_stats = new_parser_stats()
+    single_pass_stats = new_parser_stats()
+    # parse_invoice fills its own stats with page counts, the timing is taken around both parsers alike
+    page_stats = new_parser_stats()
+    mismatches = []
+    for pdf_path in file_list:
+        try:
+            legacy_order = measure_invoice(extract_order_dict_legacy, pdf_path, legacy_stats, args.trace_alloc)
+        except Exception:
+            continue
+        single_pass_order = measure_invoice(
+            lambda path: parse_invoice(path, page_stats), pdf_path, single_pass_stats, args.trace_alloc
+        )
+        if single_pass_order != legacy_order:
+            mismatches.append(pdf_path)
+
+    single_pass_stats['pages_read'] = page_stats['pages_read']
+    single_pass_stats['pages_skipped'] = page_stats['pages_skipped']
+
+    print(f'legacy      : {summarize_parser_stats(legacy_stats)}')
+    print(f'single-pass : {summarize_parser_stats(single_pass_stats)}')
+    print(f'{len(mismatches)} invoices parsed differently')
+    for pdf_path in mismatches[:20]:
+        print(f'  {pdf_path}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+
+def open_cache(cache_path, rebuild=False):
+    # Create the cache folder if it doesn't exist
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir and not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    conn = sqlite3.connect(cache_path)
+    if rebuild:
+        conn.execute('DROP TABLE IF EXISTS extraction_cache')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            pdf_path TEXT PRIMARY KEY,
+            file_size INTEGER NOT NULL,
+            file_mtime_ns INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            extractor_version TEXT NOT NULL,
+            order_json TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_extraction_cache_hash ON extraction_cache (content_hash)')
+    conn.commit()
+    return conn
+
+def hash_file(pdf_path, block_size=1 << 20):
+    # Content hash is only computed for files whose size/mtime don't match the cache
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def partition_cached_files(conn, file_list, extractor_version):
+    # Load every entry written by the current extractor in one query,
+    # rows from older extractor versions are treated as misses
+    rows = conn.execute(
+        'SELECT pdf_path, file_size, file_mtime_ns, content_hash, order_json '
+        'FROM extraction_cache WHERE extractor_version = ?',
+        (extractor_version,)
+    ).fetchall()
+    by_path = {row[0]: row for row in rows}
+    by_hash = {row[3]: row[4] for row in rows}
+
+    cached_orders = {}
+    pending_files = {}
+    relinked_entries = []
+    for pdf_path in file_list:
+        stat = os.stat(pdf_path)
+        row = by_path.get(pdf_path)
+        if row and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            cached_orders[pdf_path] = json.loads(row[4])
+            continue
+
+        # Path or mtime changed (copied, renamed or touched), fall back to the content hash
+        content_hash = hash_file(pdf_path)
+        if content_hash in by_hash:
+            order_json = by_hash[content_hash]
+            cached_orders[pdf_path] = json.loads(order_json)
+            relinked_entries.append((pdf_path, stat.st_size, stat.st_mtime_ns, content_hash, extractor_version, order_json))
+        else:
+            pending_files[pdf_path] = (stat.st_size, stat.st_mtime_ns, content_hash)
+
+    # Remember the new path/mtime so the next run hits on the cheap stat check
+    if relinked_entries:
+        conn.executemany('INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?, ?, ?, ?)', relinked_entries)
+        conn.commit()
+
+    return cached_orders, pending_files
+
+def store_extracted_orders(conn, extracted_orders, pending_files, extractor_version):
+    entries = []
+    for pdf_path, order_dict in extracted_orders.items():
+        file_size, file_mtime_ns, content_hash = pending_files[pdf_path]
+        entries.append((pdf_path, file_size, file_mtime_ns, content_hash, extractor_version, json.dumps(order_dict)))
+    conn.executemany('INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?, ?, ?, ?)', entries)
+    conn.commit()
@@ -0,0 +1,175 @@
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+
+# Shared order tooling lives in order_common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from order_common.instrumentation import count, timed
+
+# 'Rice Kheer [100 ml] 2 x 49 ₹98.00' -> name, quantity and unit price
+ITEM_LINE_PATTERN = re.compile(r'^(.*?) (\d+) x (\d+(?:\.\d+)?) ₹\d+')
+
+ORDER_ID_PREFIX = 'Zomato order:'
+
+# Fields every invoice should yield, a missing one is counted as a failure of that field
+REQUIRED_FIELDS = ['order_id', 'ordered_date_time', 'ordered_items_list', 'total_amount']
+
+
+def parse_item_block(ordered_items, metrics=None):
+    # Items are separated by a double space once the block is joined into one line
+    single_line_ordered_items = ordered_items.strip().replace('\n', ' ')
+    ordered_items_list_processed = []
+    for items in single_line_ordered_items.split("  "):
+        match = ITEM_LINE_PATTERN.match(items.strip())
+        if match:
+            ordered_items_list_processed.append({
+                'item_name': match.group(1),
+                'quantity': int(match.group(2)),
+                'unit_price': float(match.group(3))
+            })
+        else:
+            count(metrics, 'unmatched_item_lines')
+    return ordered_items_list_processed
+
+def new_scan_state():
+    return {
+        'order_id': None,
+        'ordered_date_time': None,
+        'item_lines': None,
+        'items_done': False,
+        'total_amount': None,
+        'promo': None,
+        'previous_line': None,
+        'expect': None,
+    }
+
+def scan_lines(lines, state):
+    # Fill every field in one pass over the invoice lines, returns True once every field has been read.
+    # An invoice without a promo is scanned to the end, Promo may be listed below Total
+    for line in lines:
+        # The value line following a "Total"/"Promo" label
+        if state['expect']:
+            state[state['expect']] = line
+            state['expect'] = None
+            if state['total_amount'] is not None and state['promo'] is not None and state['items_done']:
+                return True
+            continue
+
+        if state['order_id'] is None and line.startswith(ORDER_ID_PREFIX):
+            state['order_id'] = line.split(": ")[1]
+
+        elif state['ordered_date_time'] is None and 'PAID' in line:
+            # The order time is the text right above the first "PAID"
+            before_paid = line[:line.index('PAID')].strip()
+            state['ordered_date_time'] = before_paid or (state['previous_line'] or '').strip() or None
+
+        elif state['item_lines'] is None and line.endswith('Summary'):
+            state['item_lines'] = []
+            continue
+
+        elif state['item_lines'] is not None and not state['items_done']:
+            if 'Taxes' in line:
+                state['item_lines'].append(line[:line.index('Taxes')])
+                state['items_done'] = True
+            else:
+                state['item_lines'].append(line)
+
+        elif line == 'Total' and state['total_amount'] is None:
+            state['expect'] = 'total_amount'
+
+        elif line == 'Promo' and state['promo'] is None:
+            state['expect'] = 'promo'
+
+        if line.strip():
+            state['previous_line'] = line
+    return False
+
+def parse_invoice(pdf_path, stats=None, metrics=None):
+    start_time = time.perf_counter()
+    state = new_scan_state()
+    pages_read = 0
+
+    # Open each PDF once and stop extracting pages as soon as the summary has been read
+    with timed(metrics, 'pdf_open'):
+        pdf_document = fitz.open(pdf_path)
+    try:
+        page_count = pdf_document.page_count
+        for page in pdf_document:
+            pages_read += 1
+            with timed(metrics, 'text_extract', rows=1):
+                lines = page.get_text().split('\n')
+            # get_text() ends every page with a newline, drop the empty tail
+            if lines and lines[-1] == '':
+                lines.pop()
+            with timed(metrics, 'scan_lines', rows=len(lines)):
+                summary_read = scan_lines(lines, state)
+            if summary_read:
+                break
+    finally:
+        pdf_document.close()
+
+    with timed(metrics, 'parse_items'):
+        ordered_items_list = parse_item_block('\n'.join(state['item_lines']), metrics) if state['items_done'] else None
+    order_dict = {
+        'order_id': state['order_id'],
+        'ordered_date_time': state['ordered_date_time'],
+        'ordered_items_list': ordered_items_list,
+        'total_amount': state['total_amount'],
+        'promo': state['promo'] or 0
+    }
+
+    if stats is not None:
+        record_invoice_stats(stats, time.perf_counter() - start_time, pages_read, page_count)
+    count_missing_fields(metrics, order_dict)
+    return order_dict
+
+def count_missing_fields(metrics, order_dict):
+    for field in REQUIRED_FIELDS:
+        if not order_dict[field]:
+            count(metrics, f'missing_{field}')
+
+def new_parser_stats():
+    return {'latencies': [], 'peak_allocations': [], 'pages_read': 0, 'pages_skipped': 0}
+
+def record_invoice_stats(stats, seconds, pages_read, page_count):
+    stats['latencies'].append(seconds)
+    stats['pages_read'] += pages_read
+    stats['pages_skipped'] += page_count - pages_read
+
+def measure_invoice(parser, pdf_path, stats, trace_allocations=False):
+    # Per-invoice wall time and, optionally, peak Python allocation of any parser callable
+    if trace_allocations:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        order_dict = parser(pdf_path)
+    finally:
+        seconds = time.perf_counter() - start_time
+        peak_allocation = tracemalloc.get_traced_memory()[1] if trace_allocations else None
+        if trace_allocations:
+            tracemalloc.stop()
+
+    # Only invoices that parsed count towards the stats
+    stats['latencies'].append(seconds)
+    if peak_allocation is not None:
+        stats['peak_allocations'].append(peak_allocation)
+    return order_dict
+
+def summarize_parser_stats(stats):
+    latencies = sorted(stats['latencies'])
+    if not latencies:
+        return 'no invoices parsed'
+    count = len(latencies)
+    summary = (
+        f'{count} invoices, mean {sum(latencies) / count * 1000:.2f} ms, '
+        f'p50 {latencies[count // 2] * 1000:.2f} ms, p95 {latencies[min(count - 1, int(count * 0.95))] * 1000:.2f} ms'
+    )
+    if stats['peak_allocations']:
+        summary += f', mean peak allocation {sum(stats["peak_allocations"]) / len(stats["peak_allocations"]) / 1024:.1f} KiB'
+    if stats['pages_read'] or stats['pages_skipped']:
+        summary += f', {stats["pages_read"]} pages read, {stats["pages_skipped"]} skipped'
+    return summary
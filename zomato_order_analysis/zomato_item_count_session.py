@@ -1,31 +1,23 @@
-import pandas as pd
-import re
-import ast
+from zomato_order_store import ensure_order_history
+from order_common.calendar_exposure import average_per_occurrence, exposure_for
+from order_common.item_canonical import canonical_item_names
+from order_common.order_history import history_date_range, load_order_history
 
-def aggregate_item_quantities(df, filter_day, ordered_type):
-    # Filter the DataFrame
-    filtered_df = df[(df['ordered_day'] == filter_day) & (df['ordered_type'] == ordered_type)]
-    
-    # Extract the 'ordered_items_list' column and evaluate it as lists
-    ordered_items_series = filtered_df['ordered_items_list'].apply(ast.literal_eval)
-    
-    # Initialize a dictionary to store item quantities
-    item_quantities = {}
-    
-    # Iterate through each row and process the 'ordered_items_list'
-    for ordered_items_list in ordered_items_series:
-        for item_desc in ordered_items_list:
-            # Extract item name and quantity using regular expressions
-            match = re.search(r'^(.*?) (\d+)$', item_desc)
-            if match:
-                item_name = match.group(1)
-                quantity = int(match.group(2))
-                
-                # Update the item quantities in the dictionary
-                item_quantities[item_name] = item_quantities.get(item_name, 0) + quantity
-    
-    # Create a DataFrame from the aggregated item quantities
-    result_df = pd.DataFrame(item_quantities.items(), columns=['Item', 'Quantity'])
+def aggregate_item_quantities(history_dir, filter_day, ordered_type):
+    # Only the day partitions of that weekday holding that meal slot are opened, and only the item columns are read
+    _, items = load_order_history(history_dir, weekday=[filter_day], meal_slot=[ordered_type],
+                                  order_columns=['ordered_day', 'ordered_type'], item_columns=['item_name', 'quantity'])
+    items = canonical_item_names(items)
+    filtered_totals = items.groupby('item_name', observed=True)['quantity'].sum().reset_index()
+    result_df = filtered_totals.rename(columns={'item_name': 'Item', 'quantity': 'Quantity'})
+    result_df['Item'] = result_df['Item'].astype(str)
+
+    # Average per time the slot was open over the dates the history covers
+    exposure = exposure_for(history_date_range(history_dir))
+    if exposure is not None:
+        slots = exposure['slots'].loc[filter_day, ordered_type]
+        result_df['Slots'] = slots
+        result_df['Avg Per Slot'] = average_per_occurrence(result_df['Quantity'], slots)
     
     # Sort the DataFrame by item name
     result_df = result_df.sort_values(by='Item')
@@ -33,12 +25,12 @@ def aggregate_item_quantities(df, filter_day, ordered_type):
     return result_df
 
 def main():
-    df = pd.read_excel('order_counts.xlsx')
+    history_dir = ensure_order_history()
     
     filter_day = 'Thursday'
     ordered_type = 'DINNER'
     
-    result_df = aggregate_item_quantities(df, filter_day, ordered_type)
+    result_df = aggregate_item_quantities(history_dir, filter_day, ordered_type)
     sorted_df = result_df.sort_values(by='Quantity', ascending=False)
     sorted_df.to_excel(f'item_counts_{filter_day}_{ordered_type}.xlsx', index=False)
 
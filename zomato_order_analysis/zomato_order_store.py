@@ -0,0 +1,73 @@
+import ast
+import os
+import re
+import sys
+
+import pandas as pd
+
+# Shared order tooling lives in order_common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from order_common.order_history import history_exists, write_order_history
+from order_common.order_store import order_store_exists, parse_amount_cents, read_order_store, write_order_store
+
+ORDER_STORE_DIR = 'result/order_store'
+ROLLUP_CUBE_DIR = 'result/rollup_cube'
+ORDER_HISTORY_DIR = 'result/order_history'
+LEGACY_ORDER_COUNTS = 'result/order_counts.xlsx'
+
+ITEM_PATTERN = re.compile(r'^(.*?) (\d+)$')
+
+
+def build_order_tables(order_df):
+    # Split the extracted orders into an order table and a normalized item child table
+    # The invoice amounts ('₹112.80', '-₹75.20') are parsed to paise for the whole batch at once
+    orders = order_df.drop(columns=['ordered_items_list', 'total_amount', 'promo']).reset_index(drop=True).assign(
+        platform='zomato',
+        total_amount_cents=parse_amount_cents(order_df['total_amount']).array,
+        promo_cents=parse_amount_cents(order_df['promo']).fillna(0).array,
+    )
+
+    # Items arrive already structured from the extractor, so this is a flat copy
+    item_rows = [
+        (order_index, order_id, item['item_name'], item['quantity'], item['unit_price'])
+        for order_index, (order_id, ordered_items_list) in enumerate(zip(order_df['order_id'], order_df['ordered_items_list']))
+        for item in ordered_items_list or []
+    ]
+    items = pd.DataFrame(item_rows, columns=['order_index', 'order_id', 'item_name', 'quantity', 'unit_price'])
+    items = items.assign(platform='zomato', unit_price_cents=parse_amount_cents(items['unit_price'].astype('float64'))).drop(columns=['unit_price'])
+    return orders, items
+
+def parse_legacy_items(ordered_items_repr):
+    # "['Rice Kheer [100 ml] 2', ...]" -> structured items, prices were not kept in the old exports
+    items = []
+    for item_desc in ast.literal_eval(ordered_items_repr):
+        match = ITEM_PATTERN.search(item_desc)
+        if match:
+            items.append({'item_name': match.group(1), 'quantity': int(match.group(2)), 'unit_price': None})
+    return items
+
+def order_counts_export(order_df):
+    # The order_counts export keeps the familiar 'name qty' list column
+    return order_df.assign(ordered_items_list=[
+        [f"{item['item_name']} {item['quantity']}" for item in ordered_items_list or []]
+        for ordered_items_list in order_df['ordered_items_list']
+    ])
+
+def import_legacy_order_counts(excel_path, store_dir=ORDER_STORE_DIR):
+    # One-off migration of an order_counts.xlsx export written before the store existed
+    order_df = pd.read_excel(excel_path)
+    order_df['ordered_items_list'] = order_df['ordered_items_list'].apply(parse_legacy_items)
+    orders, items = build_order_tables(order_df)
+    return write_order_store(store_dir, orders, items)
+
+def load_order_tables(store_dir=ORDER_STORE_DIR, legacy_excel=LEGACY_ORDER_COUNTS, order_columns=None, item_columns=None):
+    if not order_store_exists(store_dir) and os.path.exists(legacy_excel):
+        import_legacy_order_counts(legacy_excel, store_dir)
+    return read_order_store(store_dir, order_columns, item_columns)
+
+def ensure_order_history(history_dir=ORDER_HISTORY_DIR, store_dir=ORDER_STORE_DIR, legacy_excel=LEGACY_ORDER_COUNTS):
+    # The pipeline keeps the history up to date, the store is only read if it was never written
+    if not history_exists(history_dir):
+        orders, items = load_order_tables(store_dir, legacy_excel)
+        write_order_history(history_dir, orders, items)
+    return history_dir
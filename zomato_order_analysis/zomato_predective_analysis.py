@@ -2,14 +2,37 @@ import fitz  # PyMuPDF
 import re
 import pandas as pd
 import os
-from datetime import datetime
-from collections import defaultdict
-import ast
-
-
-def list_pdf_files():
-    # Directory path
-    directory_path = 'zomato_orders'
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from extraction_cache import open_cache, partition_cached_files, store_extracted_orders
+from invoice_parser import count_missing_fields, parse_invoice, parse_item_block
+from zomato_order_store import ORDER_HISTORY_DIR, ORDER_STORE_DIR, ROLLUP_CUBE_DIR, build_order_tables, order_counts_export, write_order_store
+from order_common.calendar_exposure import average_per_occurrence, check_closure_args, exposure_for, parse_closures
+from order_common.demand_forecast import forecast_demand, forecast_sheets
+from order_common.instrumentation import (
+    add_stage, close_run_log, count, log_event, merge_metrics, new_metrics, open_run_log, print_run_summary,
+    profiled, timed
+)
+from order_common.item_canonical import canonical_item_names
+from order_common.item_aggregation import rollup
+from order_common.order_history import write_order_history
+from order_common.report_writer import REPORT_FORMATS, write_report
+from order_common.revenue import revenue_sheets
+from order_common.rollup_cube import cube_rollup, update_cube
+from order_common.timestamps import MEAL_SLOTS, add_calendar_columns, parse_meal_slots, parse_zomato_timestamps
+
+# Bump whenever an extractor changes so cached invoices get parsed again
+EXTRACTOR_VERSION = '3'
+
+FORECAST_STATE = 'result/forecast_state.parquet'
+
+ORDER_FRAME_COLUMNS = ['order_id', 'ordered_date_time', 'ordered_day', 'ordered_time', 'ordered_type', 'ordered_items_list', 'total_amount', 'promo']
+
+
+def list_pdf_files(directory_path='zomato_orders'):
     # Initialize an empty list to store file names
     file_list = []
     # Iterate through all files in the directory
@@ -37,53 +60,20 @@ def extract_order_id(text):
     return None
 
 def extract_ordered_date_time(text):
+    # The line right above "PAID" holds the order time, e.g. '25th Aug 2023 at 10:33 PM'.
+    # It is parsed later for the whole batch at once by parse_zomato_timestamps
     index_paid = text.find("PAID")
     if index_paid != -1:
         lines = text[:index_paid].strip().split('\n')
         if lines:
-            ordered_date_time = lines[-1]
-            ordered_date_time = ordered_date_time.replace('nd', '').replace('rd', '').replace('st', '').replace('th', '')
-            # Convert the input string to a datetime object
-            date_object = datetime.strptime(ordered_date_time, "%d %b %Y at %I:%M %p")
-            # Get the day of the week as an integer (0 = Monday, 6 = Sunday)
-            day_of_week = date_object.weekday()
-            # Get the day name corresponding to the integer
-            ordered_day = date_object.strftime("%A")
-            ordered_time = ordered_date_time.split('at ')[-1]
-
-            # Determine the order_type based on the ordered_time
-            if 10 <= date_object.hour < 17:
-                order_type = "LUNCH"
-            elif 8 <= date_object.hour < 11:
-                order_type = "BREAKFAST"
-            elif 18 <= date_object.hour or date_object.hour < 0:
-                order_type = "DINNER"
-            else:
-                order_type = "UNKNOWN"
-
-            return ordered_date_time, ordered_day, ordered_time, order_type
+            return lines[-1].strip()
     return None
 
-def extract_ordered_items(text):
+def extract_ordered_items(text, metrics=None):
     pattern = r"Summary\n(.*?)Taxes"
     matches = re.findall(pattern, text, re.DOTALL)
     if matches:
-        ordered_items = matches[0].strip()
-        single_line_ordered_items = ordered_items.replace('\n', ' ')
-        whitespace_items_list = single_line_ordered_items.split("  ")
-        ordered_items_list = [item.strip() for item in whitespace_items_list]
-        ordered_items_list_processed = []
-        for items in ordered_items_list:
-            pattern = r'(.*?\d) x \d+ ₹\d+'
-            match = re.match(pattern, items)
-
-            if match:
-                extracted_part = match.group(1)
-                # print(extracted_part)
-            else:
-                print("No match found.")
-            ordered_items_list_processed.append(extracted_part)
-        return ordered_items_list_processed
+        return parse_item_block(matches[0], metrics)
     return None
 
 def extract_total_amount(text):
@@ -105,180 +95,284 @@ def extract_promo_amount(text):
         pass  # Handle the ValueError here if needed
     return None
 
-def aggregate_item_counts_weekday(data, filter_day=None):
-    # Create a DataFrame
-    df = pd.DataFrame(data)
-
-    # Filter data based on ordered_day if filter_day is provided
+def aggregate_item_counts_weekday(item_totals, filter_day=None):
+    # Roll the per day/meal item totals up to a single weekday
     if filter_day:
-        df = df[df['ordered_day'] == filter_day]
+        item_totals = item_totals[item_totals['ordered_day'] == filter_day]
+    day_totals = rollup(item_totals, [])
 
-    # Initialize a dictionary to store item counts
-    item_counts = defaultdict(int)
-
-    # Regular expression to match item names and quantities
-    item_pattern = re.compile(r'^(.*?) (\d+)$')
-
-    # Iterate through each row in the DataFrame
-    for _, row in df.iterrows():
-        ordered_items_list = row['ordered_items_list']
-
-        for item_info in ordered_items_list:
-            match = item_pattern.search(item_info)
-            if match:
-                item_name = match.group(1)
-                item_quantity = int(match.group(2))
-                item_counts[item_name] += item_quantity
-    
     # Create a DataFrame from the aggregated item counts
-    result_df = pd.DataFrame(item_counts.items(), columns=['Item', 'Count'])
-    
+    result_df = day_totals.rename(columns={'item_name': 'Item', 'quantity': 'Count'})
+    result_df['Item'] = result_df['Item'].astype(str)
+
     # Add a column for ordered_day
     if filter_day:
         result_df['Ordered Day'] = filter_day
-    
+
     return result_df
 
-def aggregate_item_quantities_ordertype(df, filter_day, ordered_type):
-    # Filter the DataFrame
-    filtered_df = df[(df['ordered_day'] == filter_day) & (df['ordered_type'] == ordered_type)]
-    
-    # Extract the 'ordered_items_list' column and evaluate it as lists
-    ordered_items_series = filtered_df['ordered_items_list'].apply(ast.literal_eval)
-    
-    # Initialize a dictionary to store item quantities
-    item_quantities = {}
-    
-    # Iterate through each row and process the 'ordered_items_list'
-    for ordered_items_list in ordered_items_series:
-        for item_desc in ordered_items_list:
-            # Extract item name and quantity using regular expressions
-            match = re.search(r'^(.*?) (\d+)$', item_desc)
-            if match:
-                item_name = match.group(1)
-                quantity = int(match.group(2))
-                
-                # Update the item quantities in the dictionary
-                item_quantities[item_name] = item_quantities.get(item_name, 0) + quantity
-    
-    # Create a DataFrame from the aggregated item quantities
-    result_df = pd.DataFrame(item_quantities.items(), columns=['Item', 'Quantity'])
-    
+def aggregate_item_quantities_ordertype(item_totals, filter_day, ordered_type):
+    # Pick the weekday/meal combination out of the precomputed item totals
+    filtered_totals = item_totals[(item_totals['ordered_day'] == filter_day) & (item_totals['ordered_type'] == ordered_type)]
+    result_df = filtered_totals[['item_name', 'quantity']].rename(columns={'item_name': 'Item', 'quantity': 'Quantity'})
+    result_df['Item'] = result_df['Item'].astype(str)
+
     # Sort the DataFrame by item name
     result_df = result_df.sort_values(by='Item')
-    
-    return result_df
 
-def main():
-    # Create the "result" folder if it doesn't exist
-    if not os.path.exists('result'):
-        os.makedirs('result')
+    return result_df
 
-    order_dict_list = []
-    file_list = list_pdf_files()
-    for pdf_path in file_list:
-        print(f'Extracting data for {pdf_path}')
-        print ('=============')
+def item_count_sheets(item_totals, meal_slots=MEAL_SLOTS, exposure=None):
+    weekdays = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+    # One sheet per weekday, sorted on the 'Count' column in descending order.
+    # With an exposure every count is also divided by how often that weekday was open
+    report_sheets = {}
+    for weekday in weekdays:
+        result_df = aggregate_item_counts_weekday(item_totals, weekday)
+        if exposure is not None:
+            days = exposure['days'][weekday]
+            result_df['Days'] = days
+            result_df['Avg Per Day'] = average_per_occurrence(result_df['Count'], days)
+        report_sheets[weekday] = result_df.sort_values(by='Count', ascending=False)
+
+    # One sheet per weekday and meal slot
+    for weekday in weekdays:
+        for ordered_type in [name for name, _, _ in meal_slots]:
+            result_df = aggregate_item_quantities_ordertype(item_totals, weekday, ordered_type)
+            if exposure is not None:
+                slots = exposure['slots'].loc[weekday, ordered_type]
+                result_df['Slots'] = slots
+                result_df['Avg Per Slot'] = average_per_occurrence(result_df['Quantity'], slots)
+            report_sheets[f'{weekday}_{ordered_type}'] = result_df.sort_values(by='Quantity', ascending=False)
+    return report_sheets
+
+def extract_order_dict_legacy(pdf_path, metrics=None):
+    # Full text of every page, then one rescan of the text per field
+    with timed(metrics, 'text_extract', rows=1):
         extracted_text = extract_text_from_pdf(pdf_path)
+    with timed(metrics, 'extract_promo_amount'):
+        promo_amount = extract_promo_amount(extracted_text)
+    with timed(metrics, 'extract_order_id'):
         order_id = extract_order_id(extracted_text)
-        if order_id:
-            print(f'order_id: {order_id}')
-        else:
-            print("No order ID found.")
-
-        ordered_date_time, ordered_day, ordered_time, ordered_type = extract_ordered_date_time(extracted_text)
-        if ordered_date_time:
-            print(f'ordered_date_time: {ordered_date_time}')
-        else:
-            print("No ordered date and time found.")
-
-        if ordered_day:
-            print(f'ordered_day: {ordered_day}')
-        else:
-            print("No ordered date and time found.")
-        
-        if ordered_time:
-            print(f'ordered_time: {ordered_time}')
-        else:
-            print("No ordered date and time found.")
-
-        if ordered_time:
-            print(f'ordered_type: {ordered_type}')
-        else:
-            print("No ordered date and time found.")
-
-        ordered_items_list_processed = extract_ordered_items(extracted_text)
-        if ordered_items_list_processed:
-            print(f'ordered_items_list: {ordered_items_list_processed}')
-        else:
-            print("No ordered items found.")
-
+    with timed(metrics, 'extract_ordered_date_time'):
+        ordered_date_time = extract_ordered_date_time(extracted_text)
+    with timed(metrics, 'extract_ordered_items'):
+        ordered_items_list = extract_ordered_items(extracted_text, metrics)
+    with timed(metrics, 'extract_total_amount'):
         total_amount = extract_total_amount(extracted_text)
-        if total_amount:
-            print(f'total_amount: {total_amount}')
-        else:
-            print("No total amount found.")
-
-        promo_amount = extract_promo_amount(extracted_text)
-        if promo_amount:
-            print(f'promo: {promo_amount}')
-        else:
-            promo_amount = 0
-            print(f'promo: {promo_amount}')
-    
-        order_dict = {
-            'order_id': order_id,
-            'ordered_date_time': ordered_date_time,
-            'ordered_day': ordered_day,
-            'ordered_time': ordered_time,
-            'ordered_type': ordered_type,
-            'ordered_items_list': ordered_items_list_processed,
-            'total_amount': total_amount,
-            'promo': promo_amount
-        }
-        order_dict_list.append(order_dict)
-    
-    # print(order_dict_list)
-    order_df = pd.DataFrame(order_dict_list)
-    order_df['ordered_date_time'] = pd.to_datetime(order_df['ordered_date_time'], format='%d %b %Y at %I:%M %p')
-
-    # Sort DataFrame by "ordered_date_time"
-    sorted_order_df = order_df.sort_values(by='ordered_date_time')
-    excel_filename = f'result/order_counts.xlsx'
-    sorted_order_df.to_excel(excel_filename, index=False)
-
-    # Create a dictionary to map weekdays to their corresponding Excel filenames
-    weekday_filenames = {
-        'Sunday': 'item_counts_Sunday.xlsx',
-        'Monday': 'item_counts_Monday.xlsx',
-        'Tuesday': 'item_counts_Tuesday.xlsx',
-        'Wednesday': 'item_counts_Wednesday.xlsx',
-        'Thursday': 'item_counts_Thursday.xlsx',
-        'Friday': 'item_counts_Friday.xlsx',
-        'Saturday': 'item_counts_Saturday.xlsx'
+    order_dict = {
+        'order_id': order_id,
+        'ordered_date_time': ordered_date_time,
+        'ordered_items_list': ordered_items_list,
+        'total_amount': total_amount,
+        'promo': promo_amount if promo_amount else 0
     }
+    count_missing_fields(metrics, order_dict)
+    return order_dict
+
+INVOICE_PARSERS = {
+    'single-pass': parse_invoice,
+    'legacy': extract_order_dict_legacy,
+}
+
+def extract_order_dict(pdf_path, verbose=False, parser='single-pass', metrics=None):
+    # The per-field progress lines are only echoed with --verbose
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    log(f'Extracting data for {pdf_path}')
+    log('=============')
+    order_dict = INVOICE_PARSERS[parser](pdf_path, metrics=metrics)
+
+    if order_dict['order_id']:
+        log(f"order_id: {order_dict['order_id']}")
+    else:
+        log("No order ID found.")
+
+    if order_dict['ordered_date_time']:
+        log(f"ordered_date_time: {order_dict['ordered_date_time']}")
+    else:
+        log("No ordered date and time found.")
+
+    if order_dict['ordered_items_list']:
+        log(f"ordered_items_list: {order_dict['ordered_items_list']}")
+    else:
+        log("No ordered items found.")
+
+    if order_dict['total_amount']:
+        log(f"total_amount: {order_dict['total_amount']}")
+    else:
+        log("No total amount found.")
+
+    log(f"promo: {order_dict['promo']}")
+    return order_dict
+
+def extract_order_dict_safe(pdf_path, verbose=False, parser='single-pass'):
+    # Worker entry point: a bad PDF is reported back instead of killing the batch,
+    # the invoice's timers and field counters travel back with the result
+    metrics = new_metrics()
+    try:
+        return pdf_path, extract_order_dict(pdf_path, verbose, parser, metrics), None, metrics
+    except Exception as e:
+        return pdf_path, None, f'{type(e).__name__}: {e}', metrics
+
+def extract_orders(file_list, workers=1, chunksize=8, parser='single-pass', metrics=None, log=None, verbose=False):
+    extracted_orders = {}
+    failed_files = []
+    start_time = time.perf_counter()
+
+    if workers == 1:
+        results = (extract_order_dict_safe(pdf_path, verbose, parser) for pdf_path in file_list)
+        executor = None
+    else:
+        # Fan the files out across a process pool, PyMuPDF parsing is CPU bound
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        results = executor.map(partial(extract_order_dict_safe, parser=parser), file_list, chunksize=chunksize)
+
+    try:
+        for pdf_path, order_dict, error, invoice_metrics in results:
+            merge_metrics(metrics, invoice_metrics)
+            if error:
+                count(metrics, 'failed_invoices')
+                log_event(log, 'invoice_failed', path=pdf_path, error=error)
+                failed_files.append((pdf_path, error))
+            else:
+                if invoice_metrics['counters']:
+                    log_event(log, 'invoice_incomplete', path=pdf_path, counters=invoice_metrics['counters'])
+                extracted_orders[pdf_path] = order_dict
+    finally:
+        if executor:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - start_time
+    add_stage(metrics, 'extract', elapsed, len(file_list))
+    log_event(log, 'extract_done', files=len(file_list), extracted=len(extracted_orders),
+              failed=len(failed_files), seconds=round(elapsed, 3), workers=workers, parser=parser)
+
+    return extracted_orders, failed_files
+
+def build_order_frame(order_dict_list, meal_slots=MEAL_SLOTS):
+    order_df = pd.DataFrame(order_dict_list, columns=['order_id', 'ordered_date_time', 'ordered_items_list', 'total_amount', 'promo'])
+
+    # Normalize the timestamps of the whole batch at once and bucket them into weekday and meal slot
+    raw_date_time = order_df['ordered_date_time'].astype('string')
+    order_df['ordered_date_time'] = parse_zomato_timestamps(raw_date_time)
+    order_df['ordered_time'] = raw_date_time.str.rsplit('at ', n=1).str[-1].str.strip()
+    add_calendar_columns(order_df, 'ordered_date_time', meal_slots)
+    return order_df[ORDER_FRAME_COLUMNS]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Extract Zomato invoice PDFs and build item count reports')
+    parser.add_argument('--input-dir', default='zomato_orders', help='Directory holding the invoice PDFs')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of extraction processes, 1 runs serially and 0 uses every core')
+    parser.add_argument('--cache', default='result/extraction_cache.sqlite',
+                        help='SQLite file caching parsed invoices between runs')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every PDF without touching the cache')
+    parser.add_argument('--rebuild-cache', action='store_true', help='Drop all cached invoices before extracting')
+    parser.add_argument('--parser', choices=sorted(INVOICE_PARSERS), default='single-pass',
+                        help='Invoice parser, single-pass opens each PDF once and scans its lines once')
+    parser.add_argument('--raw-item-names', action='store_true', help='Count items under their raw invoice names')
+    parser.add_argument('--rebuild-cube', action='store_true', help='Aggregate every day into the rollup cube again')
+    parser.add_argument('--forecast-days', type=int, default=7, help='Days to forecast, 0 skips the forecast')
+    parser.add_argument('--rebuild-forecast', action='store_true', help='Refit the forecast from the full history')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='xlsx',
+                        help='xlsx writes one workbook per report, csv/parquet write one file per sheet')
+    parser.add_argument('--meal-slots', type=parse_meal_slots, default=MEAL_SLOTS,
+                        help='Meal slot hours, e.g. BREAKFAST=6-10,LUNCH=10-17,DINNER=18-24')
+    parser.add_argument('--closed', type=parse_closures,
+                        help='Days the outlet was closed, left out of the per-day averages, e.g. Monday,Sunday:BREAKFAST,2023-08-15,2023-10-20..2023-10-24')
+    parser.add_argument('--log-file', default='result/run_log.jsonl', help='JSON-lines log of this run, empty to disable')
+    parser.add_argument('--verbose', action='store_true', help='Print every extracted field (serial extraction only)')
+    parser.add_argument('--profile', help='Write cProfile stats of the main process to this file')
+    return check_closure_args(parser, parser.parse_args(argv))
+
+def write_logged_report(sheets, path, report_format, metrics, log):
+    with timed(metrics, 'report_write', rows=sum(len(df) for df in sheets.values())):
+        written = write_report(sheets, path, report_format)
+    log_event(log, 'report_written' if written else 'report_unchanged', path=path)
+
+def run_pipeline(args, metrics, log):
+    meal_slots = args.meal_slots
 
     # Create the "result" folder if it doesn't exist
+    if not os.path.exists('result'):
+        os.makedirs('result')
+
+    file_list = list_pdf_files(args.input_dir)
+    if args.no_cache:
+        order_dicts, failed_files = extract_orders(file_list, args.workers, parser=args.parser,
+                                                   metrics=metrics, log=log, verbose=args.verbose)
+    else:
+        # Only new or changed PDFs are opened, everything else comes from the cache.
+        # Rows are only served to the parser that extracted them
+        extractor_version = f'{EXTRACTOR_VERSION}:{args.parser}'
+        with timed(metrics, 'cache_lookup', rows=len(file_list)):
+            cache_conn = open_cache(args.cache, rebuild=args.rebuild_cache)
+            order_dicts, pending_files = partition_cached_files(cache_conn, file_list, extractor_version)
+        count(metrics, 'cached_invoices', len(order_dicts))
+        log_event(log, 'cache_lookup', cached=len(order_dicts), pending=len(pending_files))
+        extracted_orders, failed_files = extract_orders(list(pending_files), args.workers, parser=args.parser,
+                                                        metrics=metrics, log=log, verbose=args.verbose)
+        with timed(metrics, 'cache_store', rows=len(extracted_orders)):
+            store_extracted_orders(cache_conn, extracted_orders, pending_files, extractor_version)
+        cache_conn.close()
+        order_dicts.update(extracted_orders)
+
+    with timed(metrics, 'build_frame', rows=len(order_dicts)):
+        order_df = build_order_frame(list(order_dicts.values()), meal_slots)
+    count(metrics, 'unparsed_ordered_date_time', order_df['ordered_date_time'].isna().sum())
+
+    # Sort DataFrame by "ordered_date_time", orders without a readable date go last
+    sorted_order_df = order_df.sort_values(by='ordered_date_time', kind='stable')
+    write_logged_report({'orders': order_counts_export(sorted_order_df)}, 'result/order_counts.xlsx', args.report_format, metrics, log)
+
+    # The typed columnar store is the canonical copy, the order_counts report above is only an export
+    with timed(metrics, 'store_write', rows=len(sorted_order_df)):
+        orders, items = write_order_store(ORDER_STORE_DIR, *build_order_tables(sorted_order_df))
+    # Day partitions of the same orders, so range queries only open the days they ask for
+    with timed(metrics, 'history_write', rows=len(orders)):
+        write_order_history(ORDER_HISTORY_DIR, orders, items, metrics)
+
+    # Count the same dish under one name whatever variant text or spelling it was ordered with
+    if not args.raw_item_names:
+        with timed(metrics, 'canonicalize', rows=len(items)):
+            items = canonical_item_names(items)
+
+    # Only the days with new or changed orders are aggregated into the cube again,
+    # every weekday/meal combination is then a roll-up of the cube
+    with timed(metrics, 'cube_update', rows=len(items)):
+        cube = update_cube(ROLLUP_CUBE_DIR, orders, items, args.rebuild_cube, metrics)
+    with timed(metrics, 'aggregate', rows=len(cube)):
+        item_totals = cube_rollup(cube, ['day', 'meal_type'], meal_slots)
+        exposure = exposure_for(orders['ordered_date_time'], meal_slots, args.closed)
+        report_sheets = item_count_sheets(item_totals, meal_slots, exposure)
+
+    # All item counts go into a single workbook instead of one file per sheet
+    write_logged_report(report_sheets, 'result/item_counts.xlsx', args.report_format, metrics, log)
+
+    # Revenue, discount share and average order value per weekday and meal slot
+    with timed(metrics, 'revenue', rows=len(items)):
+        sheets = revenue_sheets(orders, items, ['day', 'meal_type'], exposure)
+    write_logged_report(sheets, 'result/revenue.xlsx', args.report_format, metrics, log)
+
+    # Next-day and next-week quantities per item and meal slot from the same history
+    if args.forecast_days:
+        forecast = forecast_demand(orders, items, FORECAST_STATE, args.forecast_days, rebuild=args.rebuild_forecast, metrics=metrics)
+        if forecast is not None:
+            write_logged_report(forecast_sheets(forecast), 'result/demand_forecast.xlsx', args.report_format, metrics, log)
 
-    # Iterate through each weekday and create filtered Excel files
-    for weekday in weekday_filenames.keys():
-        result_df = aggregate_item_counts_weekday(order_df, weekday)
-        # Sorting the DataFrame on the 'Count' column in ascending order
-        sorted_df = result_df.sort_values(by='Count', ascending=False)
-        # Save the DataFrame to an Excel file
-        excel_filename = f'result/item_counts_{weekday}.xlsx'
-        sorted_df.to_excel(excel_filename, index=False)
-
-    # Iterate through each weekday and create Excel files for both LUNCH and DINNER
-    for weekday in weekday_filenames.keys():
-        for ordered_type in ['LUNCH', 'DINNER']:
-            df = pd.read_excel('result/order_counts.xlsx')
-            result_df = aggregate_item_quantities_ordertype(df, weekday, ordered_type)
-            # Sorting the DataFrame on the 'Count' column in ascending order
-            sorted_df = result_df.sort_values(by='Quantity', ascending=False)
-            # Save the DataFrame to an Excel file with weekday and ordered_type in the name
-            excel_filename = f'result/item_counts_{weekday}_{ordered_type}.xlsx'
-            sorted_df.to_excel(excel_filename, index=False)
+def main():
+    args = parse_args()
+    metrics = new_metrics()
+    log = open_run_log(args.log_file)
+    log_event(log, 'run_start', script='zomato_predective_analysis', input_dir=args.input_dir, workers=args.workers, parser=args.parser)
+    try:
+        with profiled(args.profile):
+            run_pipeline(args, metrics, log)
+    finally:
+        close_run_log(log, metrics)
+    print_run_summary(metrics)
 
 if __name__ == "__main__":
     main()